@@ -1,4 +1,5 @@
 """Agent for detecting correct answers in multiple choice questions."""
+import os
 from typing import Dict, List
 import autogen
 from autogen import AssistantAgent
@@ -13,7 +14,7 @@ class AnswerDetector(AssistantAgent):
             "config_list": [{
                 "model": "deepseek-chat",
                 "api_key": "sk-c44ac3d56860473aadbea37581d057d6",
-                "base_url": "https://api.deepseek.com/v1",
+                "base_url": os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1"),
                 "api_type": "openai"
             }],
             "temperature": 0.0
@@ -1,16 +1,16 @@
 import sys
 import os
-import re
 from pathlib import Path
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_LEFT
-from reportlab.lib.colors import yellow
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from llm_parser import parse_questions_with_llm
+from llm_parser import RunReport, parse_questions_with_llm
+from pdf_tools.annotator import highlight_answers
+from pdf_tools.boilerplate import BoilerplateReport, extract_pages_without_boilerplate, iter_pages_without_boilerplate
+from pdf_tools.fonts import fonts_available, register_dejavu
+from pdf_tools.pages import PageText, extract_pages, text_digest, parse_pages_incremental, load_manifest, save_manifest
+from pdf_tools.optimize import optimize_all
+from pdf_tools.pipeline import run_pipeline
+from pdf_tools.writer import WRITERS, get_writer
 import hashlib, json
+from functools import partial
 
 # OCR fallback
 try:
@@ -24,67 +24,41 @@ except ImportError:
     convert_from_path = None
     pytesseract = None
 
-# Đăng ký font Unicode (cả thường và bold)
-font_path_regular = r"D:/hehe/fonts/dejavu-fonts-ttf-2.37/dejavu-fonts-ttf-2.37/ttf/DejaVuSans.ttf"
-font_path_bold = r"D:/hehe/fonts/dejavu-fonts-ttf-2.37/dejavu-fonts-ttf-2.37/ttf/DejaVuSans-Bold.ttf"
-if not (os.path.exists(font_path_regular) and os.path.exists(font_path_bold)):
+# Đăng ký font Unicode (cả thường và bold) từ thư mục fonts/ đi kèm repo
+if not fonts_available():
     print("[!] Thiếu file DejaVuSans.ttf hoặc DejaVuSans-Bold.ttf. Hãy kiểm tra lại đường dẫn hoặc tải từ https://dejavu-fonts.github.io/")
     sys.exit(1)
-pdfmetrics.registerFont(TTFont('DejaVuSans', font_path_regular))
-pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', font_path_bold))
+register_dejavu()
 
-def extract_text_from_pdf(pdf_path):
+def extract_pages_from_pdf(pdf_path, strip_boilerplate=True):
+    """Trích xuất text theo từng trang (kèm hash mỗi trang).
+
+    strip_boilerplate: bỏ các dòng lặp lại ở cùng vị trí trên nhiều trang
+    (tên trường, số trang, watermark) trước khi gửi cho LLM.
+    """
     # Try PyMuPDF first
     if fitz is not None:
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        doc.close()
-        if text.strip():
-            return text
+        if strip_boilerplate:
+            pages, report = extract_pages_without_boilerplate(pdf_path)
+            if report.lines_removed:
+                print(f"[i] Bỏ header/footer lặp lại: {report.format()}")
+        else:
+            pages = extract_pages(pdf_path)
+        if any(page.text.strip() for page in pages):
+            return pages
     # Fallback to OCR
     if convert_from_path is not None and pytesseract is not None:
-        images = convert_from_path(pdf_path)
-        text = ""
-        for img in images:
-            text += pytesseract.image_to_string(img, lang='vie')
-        return text
+        pages = []
+        for number, img in enumerate(convert_from_path(pdf_path)):
+            page_text = pytesseract.image_to_string(img, lang='vie')
+            pages.append(PageText(number=number, text=page_text, digest=text_digest(page_text)))
+        return pages
     raise RuntimeError("Không thể trích xuất text từ PDF. Hãy cài PyMuPDF hoặc pdf2image + pytesseract.")
 
-def parse_questions_and_answers(text):
-    # Tách bảng đáp án cuối file (tìm đoạn bắt đầu bằng số và dấu gạch ngang)
-    answer_key = {}
-    # Tìm đoạn đáp án cuối file (dòng liên tiếp có dạng số-đáp án)
-    answer_lines = re.findall(r'^(\d+)-([A-G])$', text, re.MULTILINE)
-    for num, ans in answer_lines:
-        answer_key[int(num)] = ans
-    # Nếu không tìm thấy, fallback về regex cũ
-    if not answer_key:
-        answer_section = re.findall(r'(\d+-[A-G])', text)
-        for item in answer_section:
-            num, ans = item.split('-')
-            answer_key[int(num)] = ans
-    # Tách từng câu hỏi
-    question_blocks = re.split(r'\nCâu \d+:', '\n' + text)
-    questions = []
-    for block in question_blocks[1:]:
-        lines = block.strip().split('\n')
-        q_text = lines[0].strip()
-        choices = []
-        for line in lines[1:]:
-            m = re.match(r'^([A-G])\.\s*(.*)', line.strip())
-            if m:
-                choices.append((m.group(1), m.group(2)))
-            if len(choices) >= 7:
-                break
-        questions.append({
-            'question': q_text,
-            'choices': choices
-        })
-    return questions, answer_key
+def extract_text_from_pdf(pdf_path):
+    return "".join(page.text for page in extract_pages_from_pdf(pdf_path))
 
-def make_pdf(questions, answer_key, pdf_path, show_answer=False):
+def make_pdf(questions, answer_key, pdf_path, show_answer=False, backend="reportlab"):
     """Generate a PDF.
     
     Args:
@@ -92,6 +66,7 @@ def make_pdf(questions, answer_key, pdf_path, show_answer=False):
         answer_key (dict): mapping question index (1-based) -> correct letter. If empty and show_answer is True, it will be built from choices having is_correct=True.
         pdf_path (str): output file path.
         show_answer (bool): whether to highlight/bold the correct answer letter.
+        backend (str): renderer, 'reportlab' (platypus) or 'story' (PyMuPDF, faster on large exams).
     """
     # Nếu answer_key rỗng và show_answer, tự xây từ is_correct
     if show_answer and not answer_key:
@@ -102,44 +77,101 @@ def make_pdf(questions, answer_key, pdf_path, show_answer=False):
                     answer_key[idx] = ch.get('letter')
                     break
 
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=18)
-    story = []
-    question_style = ParagraphStyle('Question', fontName='DejaVuSans', fontSize=12, leading=16, alignment=TA_LEFT)
-    choice_style = ParagraphStyle('Choice', fontName='DejaVuSans', fontSize=11, leading=14, leftIndent=20, alignment=TA_LEFT)
-
-    for idx, q in enumerate(questions, 1):
-        story.append(Paragraph(f"<b>Câu {idx}:</b> {q['question']}", question_style))
+    get_writer(backend).write_exam(questions, str(pdf_path), show_answer=show_answer, answer_key=answer_key)
 
-        # choices may be list[tuple] or list[dict]
-        for ch in q['choices']:
-            if isinstance(ch, tuple):
-                letter, text_choice = ch
-                is_correct = (answer_key.get(idx) == letter) if show_answer else False
-            else:
-                letter = ch.get('letter')
-                text_choice = ch.get('text')
-                is_correct = ch.get('is_correct', False) or (answer_key.get(idx) == letter)
+def report_optimized(paths):
+    """Nén / tối ưu PDF đầu ra để phát cho học sinh và in kích thước trước/sau."""
+    for result in optimize_all([str(p) for p in paths]):
+        print(f"[i] Tối ưu {result.format()}")
 
-            if show_answer and is_correct:
-                story.append(Paragraph(f"<b><font name='DejaVuSans-Bold'>{letter}</font></b>. {text_choice}", choice_style))
-            else:
-                story.append(Paragraph(f"{letter}. {text_choice}", choice_style))
-        story.append(Spacer(1, 8))
-
-    doc.build(story)
+def run_pipelined(pdf_path, inplace=False, optimize=False, strip_boilerplate=True, parse_fn=parse_questions_with_llm):
+    """Trích xuất, gọi LLM và ghi PDF chồng lên nhau (các bước nối bằng hàng đợi có giới hạn)."""
+    output_dir = Path("output")
+    output_dir.mkdir(exist_ok=True)
+    cache_dir = Path("cache")
+    cache_dir.mkdir(exist_ok=True)
+    base_name = Path(pdf_path).stem
+    pdf_original = output_dir / f"original2_{base_name}.pdf"
+    pdf_answer = output_dir / f"answer2_{base_name}.pdf"
+    answer_path = None if inplace else str(pdf_answer)
+    print("Đang xử lý theo pipeline (trích xuất → LLM → ghi PDF)...")
+    # Dòng lặp lại được học từ vài trang đầu, các trang sau được lọc ngay khi đọc
+    # nên việc trích xuất vẫn chạy song song với LLM
+    boilerplate = BoilerplateReport()
+    pages = iter_pages_without_boilerplate(pdf_path, boilerplate) if strip_boilerplate else None
+    questions, stats = run_pipeline(pdf_path, parse_fn, str(pdf_original), answer_path, pages=pages)
+    if boilerplate.lines_removed:
+        print(f"[i] Bỏ header/footer lặp lại: {boilerplate.format()}")
+    if not questions and stats.text_digest == text_digest(""):
+        # PDF scan: mọi trang đều không có text layer, chạy lại với text OCR
+        # (extract_pages_from_pdf chỉ chuyển sang OCR khi text layer rỗng)
+        print("[i] PDF không có text layer, thử OCR...")
+        questions, stats = run_pipeline(pdf_path, parse_fn, str(pdf_original), answer_path,
+                                        pages=extract_pages_from_pdf(pdf_path, strip_boilerplate))
+    print(stats.format())
+    json_path = cache_dir / f"{stats.text_digest}_{base_name}.json"
+    json_path.write_text(json.dumps(questions, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"[i] Đã lưu cache câu hỏi vào {json_path}")
+    if inplace:
+        marked = highlight_answers(pdf_path, questions, str(pdf_answer))
+        print(f"[i] Đã tô {marked}/{len(questions)} đáp án trên PDF gốc")
+    if optimize:
+        report_optimized([pdf_original, pdf_answer])
+    print("kết quả trong thư mục output/ (original2_*, answer2_*)")
 
 def main():
     if len(sys.argv) < 2:
-        print("Cách dùng: python auto_exam_pdf.py input/ten_file.pdf")
+        print("Cách dùng: python auto_exam_pdf.py input/ten_file.pdf [--inplace] [--pipeline] [--optimize] [--keep-boilerplate] [--compact] [--hedge] [--backend reportlab|story]")
         sys.exit(1)
     pdf_path = sys.argv[1]
+    # --inplace: tô đáp án đúng ngay trên PDF gốc thay vì dựng lại toàn bộ đề
+    inplace = "--inplace" in sys.argv[2:]
+    # --optimize: nén PDF đầu ra (object streams, subset font) cho bản phát hành
+    optimize = "--optimize" in sys.argv[2:]
+    # --keep-boilerplate: gửi nguyên văn bản, không bỏ header/footer lặp lại
+    strip_boilerplate = "--keep-boilerplate" not in sys.argv[2:]
+    # --backend story: dựng PDF bằng PyMuPDF Story (nhanh hơn ReportLab với đề dài)
+    backend = "reportlab"
+    if "--backend" in sys.argv[2:]:
+        idx = sys.argv.index("--backend")
+        backend = sys.argv[idx + 1] if idx + 1 < len(sys.argv) else ""
+        if backend not in WRITERS:
+            print(f"Backend không hợp lệ: {backend} (chọn một trong: {', '.join(WRITERS)})")
+            sys.exit(1)
+    # --compact: LLM chỉ trả về vị trí câu hỏi/đáp án, nội dung dựng lại từ văn bản gốc
+    # --hedge: chunk nào chờ quá p90 độ trễ được gửi thêm một bản sao
+    compact = "--compact" in sys.argv[2:]
+    hedge = "--hedge" in sys.argv[2:]
+    report = RunReport()
+    parse_fn = partial(parse_questions_with_llm, compact=compact, hedge=hedge, report=report)
     if not os.path.exists(pdf_path):
         print(f"Không tìm thấy file: {pdf_path}")
         sys.exit(1)
+    # --pipeline: chạy song song các bước, không dùng cache theo trang
+    if "--pipeline" in sys.argv[2:]:
+        # Pipeline ghi từng câu ngay khi có kết quả, chỉ có bố cục reportlab
+        if backend != "reportlab":
+            print(f"--pipeline chỉ hỗ trợ --backend reportlab (nhận được: {backend})")
+            sys.exit(1)
+        run_pipelined(pdf_path, inplace, optimize, strip_boilerplate, parse_fn)
+        if hedge:
+            print(report.format())
+        return
     print("Đang trích xuất text từ PDF...")
-    text = extract_text_from_pdf(pdf_path)
+    pages = extract_pages_from_pdf(pdf_path, strip_boilerplate)
+    text = "".join(page.text for page in pages)
+    cache_dir = Path("cache")
+    cache_dir.mkdir(exist_ok=True)
+    # Nếu đã có kết quả của bản trước, chỉ gửi lại các câu nằm trên trang đã sửa
+    manifest_path = cache_dir / f"{Path(pdf_path).stem}.pages.json"
+    previous, previous_questions = load_manifest(manifest_path)
     print("Đang phân tích câu hỏi và đáp án bằng LLM...")
-    questions = parse_questions_with_llm(text)
+    questions, manifest, reparsed = parse_pages_incremental(
+        pages, parse_fn, previous, previous_questions
+    )
+    print(f"[i] Phân tích lại {reparsed}/{len(manifest['blocks'])} khối câu hỏi")
+    if hedge:
+        print(report.format())
     # Debug số lượng câu hỏi và đáp án
     for idx, q in enumerate(questions, 1):
         print(f"Câu {idx}: {q['question']}")
@@ -147,11 +179,10 @@ def main():
             print(f"  {c['letter']}. {c['text']}")
 
     # Lưu cache JSON để tái sinh PDF nhanh
-    cache_dir = Path("cache")
-    cache_dir.mkdir(exist_ok=True)
     digest = hashlib.md5(text.encode()).hexdigest()
     json_path = cache_dir / f"{digest}_{Path(pdf_path).stem}.json"
     json_path.write_text(json.dumps(questions, ensure_ascii=False, indent=2), encoding="utf-8")
+    save_manifest(manifest_path, manifest, json_path)
     print(f"[i] Đã lưu cache câu hỏi vào {json_path}")
 
     output_dir = Path("output")
@@ -160,10 +191,16 @@ def main():
     pdf_original = output_dir / f"original2_{base_name}.pdf"
     pdf_answer = output_dir / f"answer2_{base_name}.pdf"
     print(f"Đang tạo file đề gốc: {pdf_original}")
-    make_pdf(questions, {}, str(pdf_original), show_answer=False)
+    make_pdf(questions, {}, str(pdf_original), show_answer=False, backend=backend)
     print(f"Đang tạo file đề có đáp án: {pdf_answer}")
-    # Nếu bạn có bảng đáp án đúng, truyền vào answer_key, còn không thì để trống
-    make_pdf(questions, {}, str(pdf_answer), show_answer=True)
+    if inplace:
+        marked = highlight_answers(pdf_path, questions, str(pdf_answer))
+        print(f"[i] Đã tô {marked}/{len(questions)} đáp án trên PDF gốc")
+    else:
+        # Nếu bạn có bảng đáp án đúng, truyền vào answer_key, còn không thì để trống
+        make_pdf(questions, {}, str(pdf_answer), show_answer=True, backend=backend)
+    if optimize:
+        report_optimized([pdf_original, pdf_answer])
     print("kết quả trong thư mục output/ (original2_*, answer2_*)")
 
 if __name__ == "__main__":
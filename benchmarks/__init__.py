@@ -0,0 +1 @@
+"""Benchmarks for the exam processing pipeline."""
@@ -0,0 +1,55 @@
+"""Benchmark in-place answer highlighting against re-typesetting with make_pdf.
+
+Usage:
+    python -m benchmarks.bench_inplace [--questions 2000]
+    python -m benchmarks.bench_inplace --source "input/BỘ CÂU HỎI CHUYÊN ĐỀ KSNK.pdf" --cache "cache/<digest>_<name>.json"
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from auto_exam_pdf import make_pdf
+from pdf_tools.annotator import highlight_answers
+from tests.helpers import build_questions
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--questions", type=int, default=2000)
+    ap.add_argument("--source", help="Real exam PDF to mark instead of a generated one")
+    ap.add_argument("--cache", help="Questions parsed from --source (cached LLM JSON)")
+    args = ap.parse_args()
+
+    if args.source:
+        questions = json.loads(Path(args.cache).read_text(encoding="utf-8"))
+        rng = random.Random(0)
+        for q in questions:
+            # Cached LLM output may carry no answers: pick one per question
+            if q['choices'] and not any(c.get('is_correct') for c in q['choices']):
+                q['choices'][rng.randrange(len(q['choices']))]['is_correct'] = True
+    else:
+        questions = build_questions(args.questions)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(args.source) if args.source else Path(tmp) / "source.pdf"
+        if not args.source:
+            make_pdf(questions, {}, str(source), show_answer=False)
+
+        start = time.perf_counter()
+        make_pdf(questions, {}, str(Path(tmp) / "answer_make_pdf.pdf"), show_answer=True)
+        render_time = time.perf_counter() - start
+
+        results = []
+        for style in ("highlight", "bold"):
+            start = time.perf_counter()
+            marked = highlight_answers(str(source), questions, str(Path(tmp) / f"answer_{style}.pdf"), style)
+            results.append((style, time.perf_counter() - start, marked))
+
+    print(f"{len(questions)} questions" + (f" from {source.name}" if args.source else ""))
+    print(f"  make_pdf           : {render_time:7.3f}s")
+    for style, elapsed, marked in results:
+        print(f"  in-place {style:<10}: {elapsed:7.3f}s  ({marked} marked, {render_time / elapsed:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Benchmark the pipelined mode against the sequential extract -> LLM -> render flow.
+
+LLM calls go to the local DeepSeek stand-in, so no API key is needed.
+
+Usage: python -m benchmarks.bench_pipeline [--questions 600] [--workers 4] [--latency lognormal:0.3,0.3]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import llm_parser
+from auto_exam_pdf import make_pdf
+from tests.helpers import build_questions
+from loadtest.mock_server import LatencyModel, MockConfig, MockDeepSeekServer
+from pdf_tools.pages import extract_pages
+from pdf_tools.pipeline import run_pipeline
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--questions", type=int, default=600)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--latency", default="lognormal:0.3,0.3")
+    args = ap.parse_args()
+
+    config = MockConfig(latency=LatencyModel.parse(args.latency), seed=0)
+    with tempfile.TemporaryDirectory() as tmp, MockDeepSeekServer(config) as server:
+        llm_parser.DEEPSEEK_API_URL = server.chat_url
+        llm_parser.DEEPSEEK_API_KEY = llm_parser.DEEPSEEK_API_KEY or "mock-key"
+        source = Path(tmp) / "source.pdf"
+        make_pdf(build_questions(args.questions), {}, str(source), show_answer=False)
+
+        timings = {}
+        start = time.perf_counter()
+        text = "".join(page.text for page in extract_pages(str(source)))
+        timings["extract"] = time.perf_counter() - start
+        questions = llm_parser.parse_questions_with_llm(text, max_workers=args.workers)
+        timings["llm"] = time.perf_counter() - start - timings["extract"]
+        make_pdf(questions, {}, str(Path(tmp) / "original_seq.pdf"), show_answer=False)
+        make_pdf(questions, {}, str(Path(tmp) / "answer_seq.pdf"), show_answer=True)
+        sequential = time.perf_counter() - start
+        timings["render"] = sequential - timings["extract"] - timings["llm"]
+
+        piped, stats = run_pipeline(str(source), llm_parser.parse_questions_with_llm,
+                                    str(Path(tmp) / "original_pipe.pdf"), str(Path(tmp) / "answer_pipe.pdf"),
+                                    workers=args.workers)
+        assert len(piped) == len(questions)
+
+    print(f"{args.questions} questions, {args.workers} LLM workers, latency {args.latency}")
+    print(f"  sequential : {sequential:7.2f}s  ("
+          + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()) + ")")
+    print(f"  pipelined  : {stats.wall_time:7.2f}s  ({sequential / stats.wall_time:.2f}x)")
+    print("  " + stats.format().replace("\n", "\n  "))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark the single-pass tokenizer against the previous multi-pass parser.
+
+Usage: python -m benchmarks.bench_tokenizer [--questions 100000]
+"""
+import argparse
+import re
+import time
+
+from pdf_tools.tokenizer import parse_questions_and_answers
+from tests.helpers import generate_bank
+
+def legacy_parse(text: str):
+    """The previous auto_exam_pdf.parse_questions_and_answers, kept for comparison."""
+    answer_key = {}
+    answer_lines = re.findall(r'^(\d+)-([A-G])$', text, re.MULTILINE)
+    for num, ans in answer_lines:
+        answer_key[int(num)] = ans
+    if not answer_key:
+        answer_section = re.findall(r'(\d+-[A-G])', text)
+        for item in answer_section:
+            num, ans = item.split('-')
+            answer_key[int(num)] = ans
+    question_blocks = re.split(r'\nCâu \d+:', '\n' + text)
+    questions = []
+    for block in question_blocks[1:]:
+        lines = block.strip().split('\n')
+        q_text = lines[0].strip()
+        choices = []
+        for line in lines[1:]:
+            m = re.match(r'^([A-G])\.\s*(.*)', line.strip())
+            if m:
+                choices.append((m.group(1), m.group(2)))
+            if len(choices) >= 7:
+                break
+        questions.append({'question': q_text, 'choices': choices})
+    return questions, answer_key
+
+def _timed(fn, text, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--questions", type=int, default=100_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    for mixed in (False, True):
+        text = generate_bank(args.questions, mixed=mixed)
+        label = "Câu n: / n. / n)" if mixed else "Câu n:"
+        print(f"Bank ({label}): {args.questions} questions, {len(text) / 1e6:.1f} MB")
+        legacy_time, (legacy_q, legacy_key) = _timed(legacy_parse, text, args.repeat)
+        new_time, (new_q, new_key) = _timed(parse_questions_and_answers, text, args.repeat)
+        print(f"  legacy   : {legacy_time:7.3f}s  {len(legacy_q):>7} questions, {len(legacy_key)} answers")
+        print(f"  tokenizer: {new_time:7.3f}s  {len(new_q):>7} questions, {len(new_key)} answers")
+        print(f"  speedup  : {legacy_time / new_time:.2f}x")
+
+if __name__ == "__main__":
+    main()
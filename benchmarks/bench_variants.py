@@ -0,0 +1,51 @@
+"""Benchmark exam variant generation against one make_pdf render per variant.
+
+Usage: python -m benchmarks.bench_variants [--questions 60] [--variants 100] [--workers 4]
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from auto_exam_pdf import make_pdf
+from tests.helpers import build_questions
+from pdf_tools.variants import ExamLayout, generate_variants
+
+def shuffled_questions(questions, layout, index, seed):
+    """The questions of one variant, reordered for make_pdf."""
+    variant = layout.variant(index, seed)
+    result = []
+    for q_idx, perm in zip(variant.order, variant.choice_orders):
+        q = questions[q_idx]
+        result.append({'question': q['question'], 'choices': [q['choices'][i] for i in perm]})
+    return result
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--questions", type=int, default=60)
+    ap.add_argument("--variants", type=int, default=100)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    questions = build_questions(args.questions)
+    layout = ExamLayout(questions)
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        for i in range(args.variants):
+            make_pdf(shuffled_questions(questions, layout, i, 0), {}, str(Path(tmp) / f"make_pdf_{i}.pdf"))
+        render_time = time.perf_counter() - start
+
+        results = []
+        for workers in sorted({1, args.workers}):
+            start = time.perf_counter()
+            generate_variants(questions, args.variants, str(Path(tmp) / f"variants_{workers}"), workers=workers)
+            results.append((workers, time.perf_counter() - start))
+
+    print(f"{args.variants} variants of {args.questions} questions")
+    print(f"  make_pdf per variant : {render_time:7.3f}s")
+    for workers, elapsed in results:
+        print(f"  variants, {workers:>2} worker(s): {elapsed:7.3f}s  ({render_time / elapsed:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
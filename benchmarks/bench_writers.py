@@ -0,0 +1,46 @@
+"""Benchmark the PDF writer backends on a large exam (original + answer key).
+
+Usage: python -m benchmarks.bench_writers [--questions 2000] [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from tests.helpers import build_questions
+from pdf_tools.writer import WRITERS, get_writer
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--questions", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--backends", nargs="+", default=list(WRITERS), choices=list(WRITERS))
+    args = ap.parse_args()
+
+    questions = build_questions(args.questions)
+    answer_key = {idx: next(ch['letter'] for ch in q['choices'] if ch.get('is_correct'))
+                  for idx, q in enumerate(questions, 1)}
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.backends:
+            writer = get_writer(name)
+            best = float("inf")
+            for _ in range(args.repeat):
+                original = Path(tmp) / f"{name}_original.pdf"
+                answer = Path(tmp) / f"{name}_answer.pdf"
+                start = time.perf_counter()
+                writer.write_exam(questions, str(original), show_answer=False)
+                writer.write_exam(questions, str(answer), show_answer=True, answer_key=answer_key)
+                best = min(best, time.perf_counter() - start)
+            results.append((name, best, os.path.getsize(original), os.path.getsize(answer)))
+
+    print(f"{args.questions} questions, original + answer key (best of {args.repeat})")
+    baseline = dict((name, elapsed) for name, elapsed, *_ in results).get("reportlab")
+    for name, elapsed, size_original, size_answer in results:
+        speedup = f"  ({baseline / elapsed:.1f}x vs reportlab)" if baseline else ""
+        print(f"  {name:<10}: {elapsed:7.3f}s  original {size_original / 1024:7.1f} KB, "
+              f"answer {size_answer / 1024:7.1f} KB{speedup}")
+
+if __name__ == "__main__":
+    main()
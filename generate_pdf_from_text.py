@@ -1,4 +1,3 @@
-import re
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -6,35 +5,14 @@ from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.units import mm
 from reportlab.lib.enums import TA_LEFT
 from reportlab.lib.colors import yellow
+from pdf_tools.tokenizer import parse_questions_and_answers
 
 # Đọc file text đầu vào
 with open('input.txt', 'r', encoding='utf-8') as f:
     text = f.read()
 
-# Tách bảng đáp án cuối file
-answer_key = {}
-answer_section = re.findall(r'(\d+-[A-D])', text)
-for item in answer_section:
-    num, ans = item.split('-')
-    answer_key[int(num)] = ans
-
-# Tách từng câu hỏi
-question_blocks = re.split(r'\nCâu \d+:', '\n' + text)
-questions = []
-for block in question_blocks[1:]:
-    lines = block.strip().split('\n')
-    q_text = lines[0].strip()
-    choices = []
-    for line in lines[1:]:
-        m = re.match(r'^([A-D])\.\s*(.*)', line.strip())
-        if m:
-            choices.append((m.group(1), m.group(2)))
-        if len(choices) == 4:
-            break
-    questions.append({
-        'question': q_text,
-        'choices': choices
-    })
+# Tách câu hỏi và bảng đáp án
+questions, answer_key = parse_questions_and_answers(text)
 
 # Tạo PDF
 pdf_path = 'output/final_exam.pdf'
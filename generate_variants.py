@@ -0,0 +1,48 @@
+import argparse, json
+from pathlib import Path
+from pdf_tools.optimize import optimize_pdf
+from pdf_tools.variants import generate_variants
+
+"""Usage: python generate_variants.py cache/<digest>_<name>.json -n 100 [--seed 0] [--workers 4]
+Creates shuffled exam variants (question and choice order) with their answer keys, without calling LLM."""
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate shuffled exam variants from a cached questions JSON")
+    ap.add_argument("json_file", help="cache/<digest>_<name>.json")
+    ap.add_argument("-n", "--variants", type=int, default=4, help="Number of variants")
+    ap.add_argument("--seed", type=int, default=0, help="Same seed, same variants")
+    ap.add_argument("--workers", type=int, default=1, help="Worker processes")
+    ap.add_argument("--title", default="", help="Exam title printed on each variant")
+    ap.add_argument("--first-code", type=int, default=101, help="Code of the first variant")
+    ap.add_argument("--keep-question-order", action="store_true", help="Only shuffle the choices")
+    ap.add_argument("--keep-choice-order", action="store_true", help="Only shuffle the questions")
+    ap.add_argument("--optimize", action="store_true", help="Compact the variant PDFs for web delivery")
+    args = ap.parse_args()
+
+    json_file = Path(args.json_file)
+    if not json_file.exists():
+        print("Cache JSON file not found")
+        raise SystemExit(1)
+    questions = json.loads(json_file.read_text(encoding="utf-8"))
+    base = json_file.stem.split("_", 1)[-1]  # original pdf stem
+    output_dir = Path("output") / f"variants_{base}"
+    print(f"Generating {args.variants} variants of {len(questions)} questions…")
+    results = generate_variants(questions, args.variants, str(output_dir), seed=args.seed, title=args.title,
+                                workers=args.workers, shuffle_questions=not args.keep_question_order,
+                                shuffle_choices=not args.keep_choice_order, first_code=args.first_code)
+    if args.optimize:
+        results_opt = [optimize_pdf(path) for _, path in results]
+        before = sum(r.size_before for r in results_opt)
+        after = sum(r.size_after for r in results_opt)
+        print(f"Optimized {len(results_opt)} files: {before / 1024:.0f} KB -> {after / 1024:.0f} KB "
+              f"in {sum(r.seconds for r in results_opt):.2f}s")
+    keys = {variant.code: {"pdf": Path(path).name, "order": [i + 1 for i in variant.order],
+                           "answers": variant.answers}
+            for variant, path in results}
+    keys_path = output_dir / "answer_keys.json"
+    keys_path.write_text(json.dumps({"seed": args.seed, "variants": keys}, ensure_ascii=False, indent=2),
+                         encoding="utf-8")
+    print("Done →", output_dir, keys_path)
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,23 @@ import os
 import requests
 from dotenv import load_dotenv
 import json
+import math
+import queue
 import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+from pdf_tools.tokenizer import QUESTION_MARKER_RE
 
 # Tự động load biến môi trường từ file .env nếu có
 load_dotenv()
 
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
-DEEPSEEK_API_URL = "https://api.deepseek.com/v1/chat/completions"
+# Có thể trỏ sang server giả lập (loadtest.mock_server) qua biến môi trường
+DEEPSEEK_API_URL = os.getenv("DEEPSEEK_API_URL", "https://api.deepseek.com/v1/chat/completions")
 
 PROMPT_TEMPLATE = '''Bạn là chuyên gia xử lý đề thi trắc nghiệm. Hãy phân tích đoạn văn bản sau và trích xuất các câu hỏi trắc nghiệm.
 Với mỗi câu hỏi, hãy trả về một object JSON có cấu trúc:
@@ -34,10 +44,43 @@ Văn bản cần phân tích:
 {text}
 '''
 
+# Chế độ compact: LLM chỉ trả về vị trí câu hỏi/đáp án và ký tự đáp án đúng,
+# nội dung được dựng lại từ văn bản gốc. Phần hướng dẫn + ví dụ cố định nằm
+# trong system message để DeepSeek có thể cache prefix giữa các lần gọi.
+COMPACT_SYSTEM_PROMPT = '''Bạn là chuyên gia xử lý đề thi trắc nghiệm. Văn bản đã được chia sẵn thành các khối đánh số "[b]", mỗi dòng trong khối có số thứ tự dạng "k|".
+Với mỗi câu hỏi trắc nghiệm, trả về một object JSON NGẮN, KHÔNG chép lại nội dung câu hỏi hay đáp án:
+  "b": số thứ tự khối chứa câu hỏi
+  "q": số thứ tự dòng bắt đầu câu hỏi trong khối (bỏ qua nếu là 0)
+  "c": danh sách số thứ tự dòng bắt đầu của từng đáp án, theo thứ tự A, B, C, ...
+  "a": ký tự đáp án đúng (A/B/C/...)
+Bỏ qua các khối không chứa câu hỏi. Chỉ trả về MỘT mảng JSON hợp lệ, không kèm giải thích.
+
+Ví dụ:
+Đầu vào:
+[1]
+0|Câu 1: Thủ đô của Việt Nam là gì?
+1|A. Hà Nội
+2|B. TP. Hồ Chí Minh
+3|C. Đà Nẵng
+4|D. Hải Phòng
+[2]
+0|Câu 2: Sông nào dài nhất chảy qua lãnh thổ
+1|Việt Nam?
+2|A. Sông Hồng
+3|B. Sông Mê Kông
+4|C. Sông Đà
+
+Đầu ra:
+[{"b":1,"c":[1,2,3,4],"a":"A"},{"b":2,"c":[2,3,4],"a":"B"}]
+'''
+
+_QUESTION_PREFIX_RE = re.compile(r'^\s*(?:Câu\s+\d+\s*[:\.]|\d+\s*[\.\)])\s*')
+_CHOICE_PREFIX_RE = re.compile(r'^\s*([A-G])[\.\)]\s*')
+
 def split_text_into_chunks(text: str, max_chunk_size: int = 2000) -> list[str]:
     """Chia text thành các phần nhỏ hơn dựa trên số lượng câu hỏi."""
     # Tìm các câu hỏi bằng cách tìm số thứ tự câu hỏi (ví dụ: "Câu 1:", "1.", etc)
-    question_markers = re.finditer(r'(?:^|\n)(?:\d+[\.\)]|Câu\s+\d+[:\.])', text)
+    question_markers = QUESTION_MARKER_RE.finditer(text)
     question_positions = [m.start() for m in question_markers]
     
     if not question_positions:
@@ -63,64 +106,344 @@ def split_text_into_chunks(text: str, max_chunk_size: int = 2000) -> list[str]:
     
     return chunks
 
-def parse_questions_with_llm(text: str, model: str = "deepseek-chat"):
+def split_chunk_into_blocks(chunk: str) -> list[list[str]]:
+    """Chia một chunk thành các khối (mỗi khối bắt đầu tại một marker câu hỏi), trả về danh sách dòng của từng khối."""
+    positions = [m.start() for m in QUESTION_MARKER_RE.finditer(chunk)]
+    if not positions or positions[0] != 0:
+        positions.insert(0, 0)
+    positions.append(len(chunk))
+    blocks = []
+    for start, end in zip(positions, positions[1:]):
+        lines = chunk[start:end].strip("\n").split("\n")
+        if any(line.strip() for line in lines):
+            blocks.append(lines)
+    return blocks
+
+def format_compact_blocks(blocks: list[list[str]]) -> str:
+    """Đánh số khối và dòng cho prompt compact."""
+    parts = []
+    for b, lines in enumerate(blocks, 1):
+        parts.append(f"[{b}]")
+        parts.extend(f"{k}|{line.strip()}" for k, line in enumerate(lines))
+    return "\n".join(parts)
+
+def rebuild_from_compact(blocks: list[list[str]], items: list[dict]) -> list[dict]:
+    """Dựng lại câu hỏi/đáp án từ kết quả compact ({"b", "q", "c", "a"}) và văn bản gốc."""
+    # Kiểm tra mọi phần tử một lần trước, bỏ qua phần tử sai định dạng
+    valid = []
+    for item in items:
+        try:
+            b = int(item["b"])
+            q = int(item.get("q", 0))
+            starts = sorted(int(c) for c in item.get("c", []))
+        except (AttributeError, KeyError, TypeError, ValueError):
+            continue
+        if 1 <= b <= len(blocks):
+            valid.append((b, q, starts, item.get("a")))
+    questions = []
+    for idx, (b, q, starts, answer) in enumerate(valid):
+        lines = blocks[b - 1]
+        # Câu hỏi kết thúc ở dòng bắt đầu câu kế tiếp trong cùng khối (nếu có)
+        end = next((nq for nb, nq, _, _ in valid[idx + 1:] if nb == b and nq > q), len(lines))
+        starts = [c for c in starts if q < c < end]
+        question_end = starts[0] if starts else end
+        question_text = " ".join(line.strip() for line in lines[q:question_end] if line.strip())
+        choices = []
+        for i, start in enumerate(starts):
+            stop = starts[i + 1] if i + 1 < len(starts) else end
+            choice_text = " ".join(line.strip() for line in lines[start:stop] if line.strip())
+            m = _CHOICE_PREFIX_RE.match(choice_text)
+            letter = m.group(1) if m else "ABCDEFGHIJ"[i % 10]
+            choices.append({"letter": letter, "text": choice_text[m.end():] if m else choice_text})
+        if answer:
+            for ch in choices:
+                ch["is_correct"] = (ch["letter"] == answer)
+        questions.append({"question": _QUESTION_PREFIX_RE.sub("", question_text, count=1), "choices": choices})
+    return questions
+
+def _extract_json_array(content: str) -> str:
+    # Ưu tiên lấy JSON trong code block ```json ... ```
+    code_block_match = re.search(r"```json\s*([\s\S]+?)```", content)
+    if code_block_match:
+        return code_block_match.group(1)
+    # Fallback: tìm đoạn JSON trong content (nếu LLM trả về kèm giải thích)
+    json_start = content.find("[")
+    json_end = content.rfind("]") + 1
+    return content[json_start:json_end]
+
+def percentile(values, pct: float) -> float:
+    """Percentile kiểu nearest-rank (0 với danh sách rỗng); dùng chung cho ngưỡng hedge và báo cáo load test."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+class LatencyTracker:
+    """Giữ độ trễ của các request gần nhất để tính ngưỡng hedge (p90)."""
+
+    def __init__(self, window: int = 200, min_samples: int = 5):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def add(self, latency: float) -> None:
+        with self._lock:
+            self.samples.append(latency)
+
+    def percentile(self, pct: float = 90) -> Optional[float]:
+        """Trả về percentile (nearest-rank) hoặc None khi chưa đủ mẫu."""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            samples = list(self.samples)
+        return percentile(samples, pct)
+
+# Dùng chung giữa các lần gọi để ngưỡng p90 phản ánh độ trễ thực tế của API
+_LATENCY = LatencyTracker()
+
+@dataclass
+class RunReport:
+    """Thống kê một lần chạy parse_questions_with_llm (có thể cộng dồn nhiều lần)."""
+    chunks: int = 0
+    requests: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    hedges_skipped: int = 0
+    chunk_latencies: list[float] = field(default_factory=list)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, **counts) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                if name == "chunk_latency":
+                    self.chunk_latencies.append(value)
+                else:
+                    setattr(self, name, getattr(self, name) + value)
+
+    def format(self) -> str:
+        """Tóm tắt dạng text."""
+        lines = [f"  chunks      : {self.chunks}, HTTP requests {self.requests}"]
+        if self.chunk_latencies:
+            latencies = self.chunk_latencies
+            lines.append(f"  chunk time  : p50 {percentile(latencies, 50):.3f}s  p90 {percentile(latencies, 90):.3f}s  "
+                         f"p99 {percentile(latencies, 99):.3f}s  max {max(latencies):.3f}s")
+        lines.append(f"  hedging     : {self.hedged} hedged ({self.hedged / max(self.chunks, 1):.1%} of chunks), "
+                     f"{self.hedge_wins} won by the hedge, {self.hedges_skipped} skipped (budget)")
+        return "\n".join(lines)
+
+class _HedgeBudget:
+    """Giới hạn số request dư thừa: tối đa ratio * số chunk (ít nhất 1)."""
+
+    def __init__(self, chunks: int, ratio: float):
+        self.remaining = max(1, int(chunks * ratio)) if ratio > 0 else 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+def _build_request(chunk: str, model: str, compact: bool):
+    """Tạo payload cho một chunk; trả về (data, blocks) với blocks dùng cho chế độ compact."""
+    blocks = None
+    if compact:
+        blocks = split_chunk_into_blocks(chunk)
+        messages = [
+            {"role": "system", "content": COMPACT_SYSTEM_PROMPT},
+            {"role": "user", "content": format_compact_blocks(blocks)}
+        ]
+    else:
+        messages = [
+            {"role": "user", "content": PROMPT_TEMPLATE.format(text=chunk)}
+        ]
+    data = {
+        "model": model,
+        "messages": messages,
+        "temperature": 0.0
+    }
+    return data, blocks
+
+class _StreamedReply:
+    """Nội dung ghép từ các chunk SSE, có cùng giao diện với response thường cho _decode_response."""
+    status_code = 200
+
+    def __init__(self, content: str, finish_reason: Optional[str]):
+        self.text = content
+        self.finish_reason = finish_reason
+
+    def json(self) -> dict:
+        return {"choices": [{"message": {"role": "assistant", "content": self.text},
+                             "finish_reason": self.finish_reason}]}
+
+def _read_stream(response, cancelled: threading.Event) -> Optional[_StreamedReply]:
+    """Đọc một reply dạng SSE; trả về None nếu bị huỷ giữa chừng (kết nối được đóng ngay)."""
+    parts, finish_reason = [], None
+    for line in response.iter_lines():
+        if cancelled.is_set():
+            response.close()
+            return None
+        # Bỏ qua dòng trống và comment keep-alive (": ...")
+        if not line.startswith(b"data:"):
+            continue
+        payload = line[len(b"data:"):].strip()
+        if payload == b"[DONE]":
+            break
+        choice = json.loads(payload)["choices"][0]
+        parts.append(choice.get("delta", {}).get("content") or "")
+        finish_reason = choice.get("finish_reason") or finish_reason
+    return _StreamedReply("".join(parts), finish_reason)
+
+def _post(data: dict, cancelled: Optional[threading.Event] = None):
+    """Gửi request bằng session riêng để request bị huỷ không giữ kết nối của request khác.
+
+    Khi có cancelled, request được gửi dạng stream để có thể kiểm tra cờ huỷ
+    giữa các chunk SSE; trả về None nếu request bị huỷ.
+    """
+    headers = {
+        "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+        "Content-Type": "application/json"
+    }
+    with requests.Session() as session:
+        if cancelled is None:
+            return session.post(DEEPSEEK_API_URL, headers=headers, json=data)
+        response = session.post(DEEPSEEK_API_URL, headers=headers, json=dict(data, stream=True), stream=True)
+        if response.status_code != 200:
+            response.content
+            return response
+        with response:
+            return _read_stream(response, cancelled)
+
+def _post_hedged(data: dict, budget: _HedgeBudget, report: Optional[RunReport]):
+    """Gửi request; nếu quá p90 độ trễ đã quan sát thì gửi thêm một bản sao và lấy kết quả về trước.
+
+    Request thua bị ngắt ở chunk SSE kế tiếp. Độ trễ của nó vẫn được ghi vào
+    _LATENCY (bị chặn tại thời điểm huỷ), nếu không p90 sẽ trôi dần xuống vì
+    chỉ còn mẫu của các request thắng.
+    """
+    results = queue.Queue()
+    cancelled = threading.Event()
+
+    def attempt(tag: str):
+        started = time.perf_counter()
+        try:
+            response = _post(data, cancelled)
+            error = None
+        except (requests.RequestException, ValueError) as e:
+            response, error = None, e
+        if error is None and (response is None or response.status_code == 200):
+            _LATENCY.add(time.perf_counter() - started)
+        results.put((tag, response, error))
+
+    threading.Thread(target=attempt, args=("primary",), daemon=True).start()
+    outstanding = 1
+    threshold = _LATENCY.percentile(90)
+    try:
+        first = results.get(timeout=threshold) if threshold is not None else results.get()
+    except queue.Empty:
+        if budget.acquire():
+            threading.Thread(target=attempt, args=("hedge",), daemon=True).start()
+            outstanding += 1
+            if report is not None:
+                report.add(hedged=1, requests=1)
+        elif report is not None:
+            report.add(hedges_skipped=1)
+        first = results.get()
+    outstanding -= 1
+    # Nếu request về trước bị lỗi thì chờ request còn lại
+    while outstanding and (first[2] is not None or first[1].status_code != 200):
+        first = results.get()
+        outstanding -= 1
+    cancelled.set()
+    tag, response, error = first
+    if error is not None:
+        raise error
+    if tag == "hedge" and report is not None:
+        report.add(hedge_wins=1)
+    return response
+
+def _decode_response(response, blocks: Optional[list[list[str]]]) -> list[dict]:
+    """Chuyển response của DeepSeek thành danh sách câu hỏi."""
+    if response.status_code != 200:
+        raise RuntimeError(f"DeepSeek API error: {response.status_code} {response.text}")
+    
+    try:
+        content = response.json()["choices"][0]["message"]["content"]
+        json_str = _extract_json_array(content)
+        
+        try:
+            questions = json.loads(json_str)
+            if blocks is not None:
+                return rebuild_from_compact(blocks, [q for q in questions if isinstance(q, dict)])
+            # Nếu LLM trả về trường 'answer', chuyển thành is_correct cho choices
+            for q in questions:
+                ans_letter = None
+                if isinstance(q, dict):
+                    ans_letter = q.pop('answer', None)
+                if ans_letter:
+                    for ch in q.get('choices', []):
+                        ch['is_correct'] = (ch.get('letter') == ans_letter)
+            return questions
+        except json.JSONDecodeError as je:
+            # Nếu lỗi do JSON bị cắt (thường là thiếu dấu ] hoặc ,)
+            if 'Unterminated string' in str(je) or 'Expecting' in str(je) or 'EOF' in str(je):
+                raise RuntimeError(
+                    f"Kết quả trả về từ DeepSeek bị cắt giữa chừng (do quá dài). Hãy thử chia nhỏ đề hoặc gửi ít câu hỏi hơn mỗi lần.\nLỗi: {je}\nNội dung JSON: {json_str[:500]}..."
+                )
+            else:
+                raise
+    except Exception as e:
+        raise RuntimeError(f"Không parse được JSON từ DeepSeek: {e}\nNội dung trả về: {response.text}")
+
+def _parse_chunk(chunk: str, model: str, compact: bool, budget: Optional[_HedgeBudget] = None,
+                 report: Optional[RunReport] = None) -> list[dict]:
+    """Gửi một chunk lên DeepSeek và trả về danh sách câu hỏi."""
+    data, blocks = _build_request(chunk, model, compact)
+    started = time.perf_counter()
+    if budget is None:
+        response = _post(data)
+        if response.status_code == 200:
+            _LATENCY.add(time.perf_counter() - started)
+    else:
+        response = _post_hedged(data, budget, report)
+    if report is not None:
+        report.add(requests=1, chunk_latency=time.perf_counter() - started)
+    return _decode_response(response, blocks)
+
+def parse_questions_with_llm(text: str, model: str = "deepseek-chat", compact: bool = False,
+                             hedge: bool = False, hedge_budget: float = 0.1, max_workers: int = 1,
+                             report: Optional[RunReport] = None):
+    """Trích xuất câu hỏi bằng DeepSeek.
+
+    compact=True: LLM chỉ trả về số khối, vị trí đáp án và ký tự đáp án đúng
+    thay vì chép lại toàn bộ nội dung, giảm mạnh số completion token.
+
+    hedge=True: chunk nào chờ lâu hơn p90 độ trễ đã quan sát sẽ được gửi thêm
+    một bản sao, lấy kết quả về trước; số bản sao tối đa là hedge_budget * số
+    chunk. max_workers > 1 gửi các chunk song song (kết quả vẫn theo thứ tự).
+    Thống kê được cộng vào report nếu có.
+    """
     if not DEEPSEEK_API_KEY:
         raise RuntimeError("Chưa thiết lập DEEPSEEK_API_KEY trong biến môi trường hoặc file .env!")
     
     # Chia text thành các phần nhỏ
     chunks = split_text_into_chunks(text)
+    budget = _HedgeBudget(len(chunks), hedge_budget) if hedge else None
+    if report is not None:
+        report.add(chunks=len(chunks))
+
+    def parse(chunk: str) -> list[dict]:
+        return _parse_chunk(chunk, model, compact, budget, report)
+
     all_questions = []
-    
-    for chunk in chunks:
-        prompt = PROMPT_TEMPLATE.format(text=chunk)
-        headers = {
-            "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        data = {
-            "model": model,
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.0
-        }
-        
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=data)
-        if response.status_code != 200:
-            raise RuntimeError(f"DeepSeek API error: {response.status_code} {response.text}")
-        
-        try:
-            content = response.json()["choices"][0]["message"]["content"]
-            # Ưu tiên lấy JSON trong code block ```json ... ```
-            code_block_match = re.search(r"```json\s*([\s\S]+?)```", content)
-            if code_block_match:
-                json_str = code_block_match.group(1)
-            else:
-                # Fallback: tìm đoạn JSON trong content (nếu LLM trả về kèm giải thích)
-                json_start = content.find("[")
-                json_end = content.rfind("]") + 1
-                json_str = content[json_start:json_end]
-            
-            try:
-                questions = json.loads(json_str)
-                # Nếu LLM trả về trường 'answer', chuyển thành is_correct cho choices
-                for q in questions:
-                    ans_letter = None
-                    if isinstance(q, dict):
-                        ans_letter = q.pop('answer', None)
-                    if ans_letter:
-                        for ch in q.get('choices', []):
-                            ch['is_correct'] = (ch.get('letter') == ans_letter)
+    if max_workers > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for questions in pool.map(parse, chunks):
                 all_questions.extend(questions)
-            except json.JSONDecodeError as je:
-                # Nếu lỗi do JSON bị cắt (thường là thiếu dấu ] hoặc ,)
-                if 'Unterminated string' in str(je) or 'Expecting' in str(je) or 'EOF' in str(je):
-                    raise RuntimeError(
-                        f"Kết quả trả về từ DeepSeek bị cắt giữa chừng (do quá dài). Hãy thử chia nhỏ đề hoặc gửi ít câu hỏi hơn mỗi lần.\nLỗi: {je}\nNội dung JSON: {json_str[:500]}..."
-                    )
-                else:
-                    raise
-        except Exception as e:
-            raise RuntimeError(f"Không parse được JSON từ DeepSeek: {e}\nNội dung trả về: {response.text}")
+    else:
+        for chunk in chunks:
+            all_questions.extend(parse(chunk))
     
-    return all_questions 
\ No newline at end of file
+    return all_questions
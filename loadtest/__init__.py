@@ -0,0 +1 @@
+"""Load-testing tools: a local DeepSeek stand-in and a driver."""
@@ -0,0 +1,156 @@
+"""Load-test driver: runs the LLM clients against the local DeepSeek stand-in.
+
+Usage:
+    python -m loadtest.driver --calls 50 --concurrency 8 --latency lognormal:0.5,0.6 --rate-429 0.02
+    python -m loadtest.driver --main-parallel input/ --latency constant:0.2
+    python -m loadtest.driver --latency pareto:0.2,1.2 --hedge --chunk-workers 4
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import llm_parser
+from llm_parser import percentile
+from tests.helpers import generate_bank
+from loadtest.mock_server import LatencyModel, MockConfig, MockDeepSeekServer
+
+@dataclass
+class LoadReport:
+    """Outcome of one load-test phase."""
+    name: str
+    wall_time: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+    errors: Dict[str, int] = field(default_factory=dict)
+    server_stats: List[Dict] = field(default_factory=list)
+    run: Optional[llm_parser.RunReport] = None
+
+    @property
+    def total(self) -> int:
+        return len(self.latencies) + sum(self.errors.values())
+
+    def format(self) -> str:
+        """Human-readable summary."""
+        lines = [f"== {self.name} =="]
+        lines.append(f"  wall time   : {self.wall_time:.2f}s")
+        if self.total:
+            lines.append(f"  calls       : {self.total} ({self.total / self.wall_time:.2f}/s), "
+                         f"error rate {sum(self.errors.values()) / self.total:.1%}")
+            lines.append(f"  latency     : p50 {percentile(self.latencies, 50):.3f}s  "
+                         f"p95 {percentile(self.latencies, 95):.3f}s  p99 {percentile(self.latencies, 99):.3f}s")
+        for error, count in sorted(self.errors.items()):
+            lines.append(f"    {count:>5} x {error}")
+        if self.server_stats:
+            served = [s['latency'] for s in self.server_stats]
+            cancelled = sum(1 for s in self.server_stats if s['status'] == 499)
+            failed = sum(1 for s in self.server_stats if s['status'] != 200)
+            lines.append(f"  HTTP requests: {len(served)} ({len(served) / self.wall_time:.2f}/s), "
+                         f"{failed - cancelled} non-200 ({(failed - cancelled) / len(served):.1%}), "
+                         f"{cancelled} cancelled")
+            lines.append(f"  server time : p50 {percentile(served, 50):.3f}s  "
+                         f"p95 {percentile(served, 95):.3f}s  p99 {percentile(served, 99):.3f}s")
+            tokens = sum(s.get('completion_tokens', 0) for s in self.server_stats)
+            ok = len(served) - failed
+            if ok:
+                lines.append(f"  completion  : {tokens} tokens ({tokens / ok:.0f} per request)")
+        if self.run is not None:
+            lines.append(self.run.format())
+        return "\n".join(lines)
+
+def _error_name(exc: Exception) -> str:
+    message = str(exc)
+    for marker in ("429", "500", "503", "bị cắt", "JSON"):
+        if marker in message:
+            return f"{type(exc).__name__}: {marker}"
+    return type(exc).__name__
+
+def run_parser_load(server: MockDeepSeekServer, calls: int, concurrency: int,
+                    questions_per_doc: int, compact: bool = False, hedge: bool = False,
+                    hedge_budget: float = 0.1, chunk_workers: int = 1) -> LoadReport:
+    """Call parse_questions_with_llm concurrently against the mock server."""
+    llm_parser.DEEPSEEK_API_URL = server.chat_url
+    llm_parser.DEEPSEEK_API_KEY = llm_parser.DEEPSEEK_API_KEY or "mock-key"
+    documents = [generate_bank(questions_per_doc, seed=i) for i in range(calls)]
+    mode = (", compact" if compact else "") + (f", hedge {hedge_budget:.0%}" if hedge else "")
+    report = LoadReport(f"parse_questions_with_llm x{calls} (concurrency {concurrency}{mode})",
+                        run=llm_parser.RunReport())
+
+    def one_call(text: str):
+        started = time.perf_counter()
+        try:
+            llm_parser.parse_questions_with_llm(text, compact=compact, hedge=hedge, hedge_budget=hedge_budget,
+                                                max_workers=chunk_workers, report=report.run)
+            return time.perf_counter() - started, None
+        except Exception as exc:
+            return time.perf_counter() - started, _error_name(exc)
+
+    server.reset_stats()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, error in pool.map(one_call, documents):
+            if error is None:
+                report.latencies.append(latency)
+            else:
+                report.errors[error] = report.errors.get(error, 0) + 1
+    report.wall_time = time.perf_counter() - started
+    report.server_stats = list(server.stats)
+    return report
+
+def run_main_parallel(server: MockDeepSeekServer, pdf_dir: str) -> LoadReport:
+    """Run `main.py <dir> --parallel` with its LLM traffic sent to the mock server."""
+    env = dict(os.environ,
+               DEEPSEEK_API_KEY=os.environ.get("DEEPSEEK_API_KEY", "mock-key"),
+               DEEPSEEK_API_URL=server.chat_url,
+               DEEPSEEK_BASE_URL=server.base_url)
+    main_py = Path(__file__).resolve().parent.parent / "main.py"
+    report = LoadReport(f"main.py {pdf_dir} --parallel")
+    server.reset_stats()
+    started = time.perf_counter()
+    proc = subprocess.run([sys.executable, str(main_py), pdf_dir, "--parallel"], env=env,
+                          capture_output=True, text=True)
+    report.wall_time = time.perf_counter() - started
+    if proc.returncode == 0:
+        report.latencies.append(report.wall_time)
+    else:
+        tail = (proc.stderr or proc.stdout).strip().splitlines()[-1:] or ["no output"]
+        report.errors[f"exit code {proc.returncode}: {tail[0][:120]}"] = 1
+    report.server_stats = list(server.stats)
+    return report
+
+def main(argv: Optional[List[str]] = None):
+    ap = argparse.ArgumentParser(description="Load test the LLM clients against a local DeepSeek stand-in")
+    ap.add_argument("--calls", type=int, default=20, help="parse_questions_with_llm calls")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--questions", type=int, default=40, help="Questions per generated document")
+    ap.add_argument("--compact", action="store_true", help="Use the compact answer-only output schema")
+    ap.add_argument("--hedge", action="store_true", help="Send a duplicate request for chunks slower than p90")
+    ap.add_argument("--hedge-budget", type=float, default=0.1, help="Max duplicate requests per chunk sent")
+    ap.add_argument("--chunk-workers", type=int, default=1, help="Chunks sent in parallel per document")
+    ap.add_argument("--main-parallel", metavar="DIR", help="Also run main.py DIR --parallel")
+    ap.add_argument("--latency", default="lognormal:0.3,0.5")
+    ap.add_argument("--rate-429", type=float, default=0.0)
+    ap.add_argument("--rate-5xx", type=float, default=0.0)
+    ap.add_argument("--truncate", type=float, default=0.0)
+    ap.add_argument("--record", help="Record real API responses to this JSONL file")
+    ap.add_argument("--replay", help="Replay responses from this JSONL file")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    config = MockConfig(latency=LatencyModel.parse(args.latency), rate_429=args.rate_429,
+                        rate_5xx=args.rate_5xx, truncate_rate=args.truncate,
+                        record_path=args.record, replay_path=args.replay, seed=args.seed)
+    with MockDeepSeekServer(config) as server:
+        print(f"Mock DeepSeek at {server.chat_url} (latency {args.latency})")
+        if args.calls:
+            print(run_parser_load(server, args.calls, args.concurrency, args.questions, args.compact,
+                                  args.hedge, args.hedge_budget, args.chunk_workers).format())
+        if args.main_parallel:
+            print(run_main_parallel(server, args.main_parallel).format())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""Local stand-in for the DeepSeek chat completions endpoint.
+
+Usage: python -m loadtest.mock_server --port 8765 --latency lognormal:0.8,0.5 --rate-429 0.05
+Then point the clients at it:
+    DEEPSEEK_API_URL=http://127.0.0.1:8765/v1/chat/completions
+    DEEPSEEK_BASE_URL=http://127.0.0.1:8765/v1
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+import requests
+
+from llm_parser import COMPACT_SYSTEM_PROMPT
+from pdf_tools.tokenizer import CHOICE, QUESTION, TEXT, parse_questions_and_answers, tokenize
+
+# Marker that ends the instructions of llm_parser.PROMPT_TEMPLATE
+PARSER_TEXT_MARKER = "Văn bản cần phân tích:"
+_COMPACT_LINE_RE = re.compile(r'^(\d+)\|(.*)$')
+_COMPACT_BLOCK_RE = re.compile(r'^\[(\d+)\]$')
+# Seconds between SSE keep-alive comments while a streamed reply is pending
+KEEPALIVE_INTERVAL = 0.05
+
+@dataclass
+class LatencyModel:
+    """Distribution of the simulated completion time, in seconds."""
+    kind: str = "constant"
+    params: List[float] = field(default_factory=lambda: [0.0])
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """Build a model from 'kind:p1,p2', e.g. 'uniform:0.2,1.5'.
+
+        Kinds: constant:s, uniform:lo,hi, lognormal:median,sigma, pareto:scale,alpha
+        """
+        kind, _, params = spec.partition(":")
+        values = [float(p) for p in params.split(",") if p]
+        if kind not in ("constant", "uniform", "lognormal", "pareto"):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        return cls(kind, values or [0.0])
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw one latency value."""
+        p = self.params
+        if self.kind == "uniform":
+            return rng.uniform(p[0], p[1])
+        if self.kind == "lognormal":
+            return p[0] * rng.lognormvariate(0.0, p[1])
+        if self.kind == "pareto":
+            return p[0] * rng.paretovariate(p[1])
+        return p[0]
+
+@dataclass
+class MockConfig:
+    """Behaviour of the mock server."""
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    truncate_rate: float = 0.0
+    record_path: Optional[str] = None
+    replay_path: Optional[str] = None
+    upstream_url: str = "https://api.deepseek.com/v1/chat/completions"
+    seed: Optional[int] = None
+
+def request_key(body: Dict) -> str:
+    """Key identifying a request for record/replay (model + messages)."""
+    canonical = json.dumps({'model': body.get('model'), 'messages': body.get('messages')},
+                           ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def synthesize_reply(body: Dict) -> str:
+    """Produce a plausible assistant reply for the prompts this repo sends.
+
+    Parser prompts get a JSON array built from the exam text with the local
+    tokenizer; anything else (AnswerDetector) gets a single answer letter.
+    """
+    messages = body.get('messages') or [{}]
+    prompt = messages[-1].get('content', '')
+    if messages[0].get('role') == 'system' and messages[0].get('content') == COMPACT_SYSTEM_PROMPT:
+        return _synthesize_compact_reply(prompt)
+    if PARSER_TEXT_MARKER not in prompt:
+        return "A"
+    text = prompt.split(PARSER_TEXT_MARKER, 1)[1]
+    questions, _ = parse_questions_and_answers(text)
+    result = []
+    for q in questions:
+        choices = [{'letter': letter, 'text': choice} for letter, choice in q['choices']]
+        answer = choices[0]['letter'] if choices else "A"
+        result.append({'question': q['question'], 'choices': choices, 'answer': answer})
+    return "```json\n" + json.dumps(result, ensure_ascii=False) + "\n```"
+
+def _synthesize_compact_reply(prompt: str) -> str:
+    """Answer a compact-mode prompt with block/line offsets only.
+
+    Every question line gets its own item, so a block holding two questions
+    yields two items; "q" is left out when it is 0, as the prompt asks.
+    """
+    items = []
+    block = current = None
+    for line in prompt.split("\n"):
+        header = _COMPACT_BLOCK_RE.match(line)
+        if header:
+            block, current = int(header.group(1)), None
+            continue
+        numbered = _COMPACT_LINE_RE.match(line)
+        if not numbered or block is None:
+            continue
+        offset = int(numbered.group(1))
+        kind = next(tokenize(numbered.group(2)), (TEXT,))[0]
+        if current is None or (kind is QUESTION and offset > current['q']):
+            current = {'b': block, 'q': offset, 'c': [], 'question': kind is QUESTION}
+            items.append(current)
+        if kind is CHOICE:
+            current['c'].append(offset)
+    result = []
+    # Like the full reply, a question whose choices lost their markers is kept
+    for item in items:
+        if item['question'] or item['c']:
+            reply = {'b': item['b'], 'q': item['q'], 'c': item['c'], 'a': "A"}
+            if not reply['q']:
+                del reply['q']
+            result.append(reply)
+    return json.dumps(result, separators=(",", ":"))
+
+def completion_response(body: Dict, content: str) -> Dict:
+    """Wrap content in the chat completion response shape."""
+    prompt_chars = sum(len(m.get('content', '')) for m in body.get('messages', []))
+    return {
+        'id': f"chatcmpl-{uuid.uuid4().hex}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': body.get('model', 'deepseek-chat'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop'
+        }],
+        'usage': {
+            'prompt_tokens': prompt_chars // 4,
+            'completion_tokens': len(content) // 4,
+            'total_tokens': (prompt_chars + len(content)) // 4
+        }
+    }
+
+class MockDeepSeekServer:
+    """Threaded HTTP server implementing POST /v1/chat/completions."""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        """Initialize the server (port 0 picks a free port).
+
+        Args:
+            config: Latency, error injection and record/replay settings
+            host: Interface to bind
+            port: Port to bind
+        """
+        self.config = config or MockConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._recorded: Dict[str, Dict] = {}
+        if self.config.replay_path:
+            with open(self.config.replay_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._recorded[entry['key']] = entry['response']
+        self.stats: List[Dict] = []
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """OpenAI-style base URL (for AnswerDetector / DEEPSEEK_BASE_URL)."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def chat_url(self) -> str:
+        """Full chat completions URL (for llm_parser / DEEPSEEK_API_URL)."""
+        return f"{self.base_url}/chat/completions"
+
+    def start(self) -> "MockDeepSeekServer":
+        """Serve requests in a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve requests in the current thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_stats(self) -> None:
+        """Forget the per-request log."""
+        with self._lock:
+            self.stats = []
+
+    def _draw(self):
+        with self._lock:
+            return (self.config.latency.sample(self._rng), self._rng.random(),
+                    self._rng.random(), self._rng.random())
+
+    def _record(self, key: str, response: Dict) -> None:
+        with self._lock:
+            with open(self.config.record_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({'key': key, 'response': response}, ensure_ascii=False) + "\n")
+
+    def _log(self, status: int, started: float, streamed: bool, completion_tokens: int = 0) -> None:
+        with self._lock:
+            self.stats.append({'status': status, 'latency': time.perf_counter() - started,
+                               'stream': streamed, 'completion_tokens': completion_tokens})
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict, headers: Optional[Dict] = None) -> None:
+                data = json.dumps(payload, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _write_chunk(self, data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _send_stream(self, response: Dict, latency: float) -> None:
+                # Like the real API, headers go out at once and the wait is
+                # filled with keep-alive comments, so a client that hangs up
+                # is noticed on the next write.
+                content = response['choices'][0]['message']['content']
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                deadline = time.perf_counter() + latency
+                while True:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    time.sleep(min(remaining, KEEPALIVE_INTERVAL))
+                    self._write_chunk(b": keep-alive\n\n")
+                step = max(1, len(content) // 20)
+                pieces = [content[i:i + step] for i in range(0, len(content), step)] or [""]
+                for idx, piece in enumerate(pieces):
+                    chunk = {
+                        'id': response['id'],
+                        'object': 'chat.completion.chunk',
+                        'created': response['created'],
+                        'model': response['model'],
+                        'choices': [{
+                            'index': 0,
+                            'delta': ({'role': 'assistant', 'content': piece} if idx == 0
+                                      else {'content': piece}),
+                            'finish_reason': None
+                        }]
+                    }
+                    self._write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode())
+                final = {'id': response['id'], 'object': 'chat.completion.chunk',
+                         'created': response['created'], 'model': response['model'],
+                         'choices': [{'index': 0, 'delta': {},
+                                      'finish_reason': response['choices'][0].get('finish_reason', 'stop')}]}
+                self._write_chunk(f"data: {json.dumps(final)}\n\n".encode())
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+                self.close_connection = True
+
+            def do_POST(self):
+                started = time.perf_counter()
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    self._send_json(400, {'error': {'message': "Invalid JSON body"}})
+                    server._log(400, started, False)
+                    return
+
+                config = server.config
+                latency, error_roll, status_roll, truncate_roll = server._draw()
+                streamed = bool(body.get('stream'))
+                if not streamed or error_roll < config.rate_429 + config.rate_5xx:
+                    time.sleep(latency)
+                    latency = 0.0
+
+                if error_roll < config.rate_429:
+                    self._send_json(429, {'error': {'message': "Rate limit reached", 'type': 'rate_limit_error'}},
+                                    {"Retry-After": "1"})
+                    server._log(429, started, False)
+                    return
+                if error_roll < config.rate_429 + config.rate_5xx:
+                    status = 503 if status_roll < 0.5 else 500
+                    self._send_json(status, {'error': {'message': "Service unavailable", 'type': 'server_error'}})
+                    server._log(status, started, False)
+                    return
+
+                key = request_key(body)
+                response = server._recorded.get(key)
+                if response is None and config.record_path:
+                    upstream = requests.post(
+                        config.upstream_url, json=dict(body, stream=False),
+                        headers={"Authorization": self.headers.get("Authorization", ""),
+                                 "Content-Type": "application/json"})
+                    if upstream.status_code != 200:
+                        self._send_json(upstream.status_code, upstream.json())
+                        server._log(upstream.status_code, started, False)
+                        return
+                    response = upstream.json()
+                    server._record(key, response)
+                if response is None:
+                    response = completion_response(body, synthesize_reply(body))
+
+                if truncate_roll < config.truncate_rate:
+                    # Simulate a reply cut off mid-JSON (e.g. max_tokens reached)
+                    content = response['choices'][0]['message']['content']
+                    response = json.loads(json.dumps(response))
+                    response['choices'][0]['message']['content'] = content[:max(1, len(content) // 2)]
+                    response['choices'][0]['finish_reason'] = 'length'
+
+                if streamed:
+                    try:
+                        self._send_stream(response, latency)
+                    except (BrokenPipeError, ConnectionResetError):
+                        # The client gave up (e.g. a cancelled hedged request)
+                        server._log(499, started, True)
+                        self.close_connection = True
+                        return
+                else:
+                    self._send_json(200, response)
+                server._log(200, started, streamed, response.get('usage', {}).get('completion_tokens', 0))
+
+        return Handler
+
+def main():
+    ap = argparse.ArgumentParser(description="Local DeepSeek chat completions stand-in")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency", default="constant:0", help="e.g. lognormal:0.8,0.5 or pareto:0.3,1.5")
+    ap.add_argument("--rate-429", type=float, default=0.0)
+    ap.add_argument("--rate-5xx", type=float, default=0.0)
+    ap.add_argument("--truncate", type=float, default=0.0, help="Fraction of replies cut mid-JSON")
+    ap.add_argument("--record", help="Forward to the real API and append responses to this JSONL file")
+    ap.add_argument("--replay", help="Serve responses recorded in this JSONL file")
+    ap.add_argument("--seed", type=int)
+    args = ap.parse_args()
+
+    config = MockConfig(latency=LatencyModel.parse(args.latency), rate_429=args.rate_429,
+                        rate_5xx=args.rate_5xx, truncate_rate=args.truncate,
+                        record_path=args.record, replay_path=args.replay, seed=args.seed)
+    server = MockDeepSeekServer(config, args.host, args.port)
+    print(f"Mock DeepSeek listening on {server.chat_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
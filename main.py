@@ -9,10 +9,13 @@ from rich.progress import Progress
 from dotenv import load_dotenv
 from autogen import UserProxyAgent
 import multiprocessing as mp
+from functools import partial
 
 from agents.detector import AnswerDetector
+from pdf_tools.annotator import highlight_answers
+from pdf_tools.optimize import optimize_all
 from pdf_tools.parser import PDFParser
-from pdf_tools.writer import PDFWriter
+from pdf_tools.writer import WRITERS, get_writer
 
 # Load environment variables
 load_dotenv()
@@ -21,17 +24,21 @@ load_dotenv()
 app = typer.Typer()
 console = Console()
 
-def process_pdf(pdf_path: str, lang: str = "en") -> None:
+def process_pdf(pdf_path: str, lang: str = "en", inplace: bool = False, optimize: bool = False,
+                backend: str = "canvas") -> None:
     """Process a single PDF file.
     
     Args:
         pdf_path: Path to the PDF file
         lang: Interface language (vi/en)
+        inplace: Mark answers on the source PDF instead of re-typesetting it
+        optimize: Compact the output PDFs for web delivery
+        backend: Output renderer (canvas, reportlab or story)
     """
     try:
         # Initialize components
         parser = PDFParser(pdf_path)
-        writer = PDFWriter()
+        writer = get_writer(backend)
         detector = AnswerDetector()
         
         # Extract questions
@@ -59,7 +66,14 @@ def process_pdf(pdf_path: str, lang: str = "en") -> None:
         answer_key_path = output_dir / f"answerkey_{filename}.pdf"
         
         writer.write_original(questions, str(original_path))
-        writer.write_answer_key(questions, str(answer_key_path))
+        if inplace:
+            highlight_answers(str(pdf_path), questions, str(answer_key_path))
+        else:
+            writer.write_answer_key(questions, str(answer_key_path))
+        
+        if optimize:
+            for result in optimize_all([str(original_path), str(answer_key_path)]):
+                console.print(f"Optimized {result.format()}")
         
         # Cleanup
         parser.close()
@@ -71,11 +85,21 @@ def process_pdf(pdf_path: str, lang: str = "en") -> None:
         console.print(f"[red]Error processing {pdf_path}: {str(e)}[/red]")
         raise
 
+def check_backend(value: str) -> str:
+    """Reject unknown --backend values while the arguments are parsed."""
+    if value not in WRITERS:
+        raise typer.BadParameter(f"unknown backend {value!r} (choose from {', '.join(WRITERS)})")
+    return value
+
 @app.command()
 def main(
     pdf_path: str = typer.Argument(..., help="Path to the PDF file"),
     lang: str = typer.Option("en", help="Interface language (vi/en)"),
-    parallel: bool = typer.Option(False, help="Process multiple PDFs in parallel")
+    parallel: bool = typer.Option(False, help="Process multiple PDFs in parallel"),
+    inplace: bool = typer.Option(False, help="Highlight answers on the source PDF instead of re-rendering it"),
+    optimize: bool = typer.Option(False, help="Compact the output PDFs (object streams, font subsetting)"),
+    backend: str = typer.Option("canvas", callback=check_backend,
+                                help="Output renderer: canvas, reportlab or story (PyMuPDF, fastest)")
 ):
     """Process PDF exam papers to extract questions and answers."""
     # Check DeepSeek API key
@@ -85,7 +109,7 @@ def main(
     
     # Process single file
     if not parallel:
-        process_pdf(pdf_path, lang)
+        process_pdf(pdf_path, lang, inplace, optimize, backend)
         console.print("\n✅ Done. Check ./output for results.")
         return
     
@@ -104,7 +128,7 @@ def main(
         task = progress.add_task("Processing PDFs...", total=len(pdf_files))
         
         with mp.Pool() as pool:
-            for _ in pool.imap_unordered(process_pdf, pdf_files):
+            for _ in pool.imap_unordered(partial(process_pdf, lang=lang, inplace=inplace, optimize=optimize, backend=backend), pdf_files):
                 progress.update(task, advance=1)
     
     console.print("\n✅ Done. Check ./output for results.")
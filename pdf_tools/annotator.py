@@ -0,0 +1,234 @@
+"""Mark correct answers directly on the source PDF instead of re-typesetting it."""
+import difflib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import fitz  # PyMuPDF
+
+from pdf_tools.parser import PDFParser, TextSpan
+
+_QUESTION_RE = re.compile(r'^(?:Câu\s+)?\d+\s*[\.\):](?!\d)')
+_CHOICE_RE = re.compile(r'^([A-G])[\.\)]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+STYLE_HIGHLIGHT = "highlight"
+STYLE_BOLD = "bold"
+
+@dataclass
+class ChoiceLocation:
+    """Where a choice is printed in the source PDF."""
+    letter: str
+    label: TextSpan
+    rects: List[Tuple[int, Tuple[float, float, float, float]]] = field(default_factory=list)
+
+@dataclass
+class QuestionLocation:
+    """A question found in the source PDF: its text (without the number) and its choices."""
+    text: str
+    page: int
+    y: float
+    choices: List[ChoiceLocation] = field(default_factory=list)
+
+def _group_lines(spans: List[TextSpan]) -> List[List[TextSpan]]:
+    """Group consecutive spans sharing a page and baseline into lines."""
+    lines = []
+    for span in spans:
+        if span.bbox is None:
+            continue
+        if lines:
+            last = lines[-1][-1]
+            if last.page == span.page and abs(last.origin[1] - span.origin[1]) < 1.0:
+                lines[-1].append(span)
+                continue
+        lines.append([span])
+    return lines
+
+def locate_questions(spans: List[TextSpan]) -> List[QuestionLocation]:
+    """Find each question and its choices in document order.
+
+    Args:
+        spans: Spans returned by PDFParser.extract_spans
+
+    Returns:
+        List[QuestionLocation]: Questions with the position of each choice
+    """
+    questions: List[QuestionLocation] = []
+    current: Optional[ChoiceLocation] = None
+    for line in _group_lines(spans):
+        text = "".join(span.text for span in line).strip()
+        if not text:
+            continue
+        question_match = _QUESTION_RE.match(text)
+        if question_match:
+            questions.append(QuestionLocation(text[question_match.end():].strip(), line[0].page, line[0].bbox[1]))
+            current = None
+            continue
+        choice_match = _CHOICE_RE.match(text)
+        if choice_match:
+            if not questions:
+                questions.append(QuestionLocation("", line[0].page, line[0].bbox[1]))
+            label = next(span for span in line if span.text.strip())
+            current = ChoiceLocation(letter=choice_match.group(1), label=label)
+            questions[-1].choices.append(current)
+        elif current is None and questions:
+            # Wrapped question text
+            questions[-1].text += " " + text
+        if current is not None:
+            # Lines without a marker continue the current choice
+            x0, y0, x1, y1 = line[0].bbox
+            for span in line[1:]:
+                bx0, by0, bx1, by1 = span.bbox
+                x0, y0, x1, y1 = min(x0, bx0), min(y0, by0), max(x1, bx1), max(y1, by1)
+            current.rects.append((line[0].page, (x0, y0, x1, y1)))
+    return questions
+
+def _question_key(text: str) -> str:
+    return _WHITESPACE_RE.sub(' ', text).strip().lower()
+
+def align_questions(located: List[QuestionLocation], questions: List[Dict]) -> List[Optional[int]]:
+    """Match parsed questions to located ones by sequence alignment of their texts.
+
+    Identical texts are paired, and so are equally long runs of differing
+    texts between them (the LLM corrected a typo); questions the PDF split
+    or merged differently are left unmatched.
+
+    Returns:
+        List[Optional[int]]: For each parsed question, the index of its located question or None
+    """
+    matcher = difflib.SequenceMatcher(None, [_question_key(q.text) for q in located],
+                                      [_question_key(str(q.get('question', ''))) for q in questions],
+                                      autojunk=False)
+    matches: List[Optional[int]] = [None] * len(questions)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal' or (tag == 'replace' and i2 - i1 == j2 - j1):
+            for offset in range(j2 - j1):
+                matches[j1 + offset] = i1 + offset
+    return matches
+
+def _correct_letter(question: Dict) -> Optional[str]:
+    for choice in question.get('choices', []):
+        if isinstance(choice, dict) and choice.get('is_correct'):
+            return choice.get('letter')
+    return question.get('answer')
+
+def _search_after(doc: fitz.Document, start: Tuple[int, float], text: str,
+                  end_page: Optional[int] = None) -> Optional[Tuple[int, fitz.Rect]]:
+    """Find the first occurrence of text at or below start = (page, y), up to end_page, in reading order."""
+    needle = " ".join(text.split())[:40]
+    if not needle:
+        return None
+    start_page, start_y = start
+    stop = len(doc) if end_page is None else min(end_page + 1, len(doc))
+    for page in doc.pages(start_page, stop):
+        hits = sorted(page.search_for(needle), key=lambda rect: (rect.y0, rect.x0))
+        for hit in hits:
+            if page.number > start_page or hit.y1 > start_y:
+                return page.number, hit
+    return None
+
+def _search_choice(doc: fitz.Document, start: Tuple[int, float], end_page: Optional[int], question: str,
+                   letter: str, text: str) -> Optional[Tuple[int, fitz.Rect]]:
+    """Search a choice as "<letter>. <text>" (or "<letter>) <text>") below its question.
+
+    The question text must be found first, so short choices ("2", "Đúng")
+    cannot match an earlier question number or another question's choice.
+    """
+    anchor = _search_after(doc, start, question, end_page)
+    if anchor is None:
+        return None
+    start = (anchor[0], anchor[1].y0)
+    for separator in (".", ")"):
+        hit = _search_after(doc, start, f"{letter}{separator} {text}", end_page)
+        if hit is not None:
+            return hit
+    return None
+
+def _apply_marks(doc: fitz.Document, marks: Dict[int, List[Tuple[fitz.Rect, Optional[TextSpan]]]],
+                 style: str) -> None:
+    """Apply the collected marks with one annotation or text write per page."""
+    bold_font = fitz.Font("hebo") if style == STYLE_BOLD else None
+    for page_no, targets in marks.items():
+        page = doc[page_no]
+        if bold_font is None:
+            page.add_highlight_annot([rect for rect, _ in targets])
+            continue
+        writer = fitz.TextWriter(page.rect)
+        words = None
+        for rect, label in targets:
+            if label is not None:
+                # Redraw the letter over the original, filled and stroked to embolden it
+                letter = label.text.strip()[:2]
+                x = label.origin[0]
+                if label.text[:1].isspace():
+                    # The span starts with whitespace: start at the letter's own word box
+                    if words is None:
+                        words = page.get_text("words")
+                    box = fitz.Rect(label.bbox)
+                    x = next((w[0] for w in words if w[4].startswith(letter)
+                              and box.contains(fitz.Point(w[0] + 0.5, (w[1] + w[3]) / 2))), x)
+                writer.append((x, label.origin[1]), letter, font=bold_font, fontsize=label.font_size)
+            else:
+                page.draw_rect(rect, color=(0, 0, 0), width=1.2)
+        writer.write_text(page, render_mode=2)
+
+def highlight_answers(pdf_path: str, questions: List[Dict], output_path: str,
+                      style: str = STYLE_HIGHLIGHT) -> int:
+    """Mark the correct choice of every question on a copy of the source PDF.
+
+    Parsed questions are aligned with the questions found in the PDF by
+    their text (see align_questions) and marked at the located choice. Only
+    those that do not align are searched with page.search_for, as
+    "<letter>. <text>" below the question's own text, between the
+    neighbouring aligned questions.
+
+    Args:
+        pdf_path: Source PDF the questions were parsed from
+        questions: Parsed questions (choices with is_correct, or an 'answer' letter)
+        output_path: Path to save the marked PDF
+        style: 'highlight' for highlight annotations, 'bold' for a bold letter overlay
+
+    Returns:
+        int: Number of answers marked
+    """
+    # Only span positions are needed; skip rendering (and OCR of) every page
+    parser = PDFParser(pdf_path, detect_raster_highlights=False)
+    try:
+        located = locate_questions(parser.extract_spans())
+        matches = align_questions(located, questions)
+        doc = parser.doc
+        # Page of the next aligned question after each one: bounds the search fallback
+        next_page: List[Optional[int]] = [None] * len(questions)
+        upcoming = None
+        for idx in range(len(questions) - 1, -1, -1):
+            next_page[idx] = upcoming
+            if matches[idx] is not None:
+                upcoming = located[matches[idx]].page
+        marks: Dict[int, List[Tuple[fitz.Rect, Optional[TextSpan]]]] = {}
+        marked = 0
+        cursor = (0, 0.0)  # position (page, y) of the previous question
+        for idx, question in enumerate(questions):
+            letter = _correct_letter(question)
+            if matches[idx] is not None:
+                location = located[matches[idx]]
+                cursor = (location.page, location.y)
+                choice = next((c for c in location.choices if c.letter == letter), None)
+                if choice is not None:
+                    targets = choice.rects if style != STYLE_BOLD else choice.rects[:1]
+                    for page_no, rect in targets:
+                        marks.setdefault(page_no, []).append((fitz.Rect(rect), choice.label))
+                    marked += 1
+                    continue
+            if not letter:
+                continue
+            text = next((c.get('text', '') for c in question.get('choices', [])
+                         if isinstance(c, dict) and c.get('letter') == letter), '')
+            hit = _search_choice(doc, cursor, next_page[idx], question.get('question', ''), letter, text)
+            if hit is not None:
+                cursor = (hit[0], hit[1].y0)
+                marks.setdefault(hit[0], []).append((hit[1], None))
+                marked += 1
+        _apply_marks(doc, marks, style)
+        doc.save(output_path, garbage=1, deflate=True)
+    finally:
+        parser.close()
+    return marked
@@ -0,0 +1,186 @@
+"""Detection and removal of headers, footers and watermarks repeated on every page."""
+import math
+import re
+from dataclasses import dataclass, field
+from statistics import median
+from typing import Dict, Iterator, List, Sequence, Tuple
+import fitz  # PyMuPDF
+
+from pdf_tools.pages import PageText, open_pdf, text_digest
+from pdf_tools.tokenizer import CHOICE, QUESTION, tokenize
+
+_DIGITS_RE = re.compile(r'\d+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+@dataclass
+class PageLine:
+    """One text line of a page: its text and vertical centre as a fraction of the page height."""
+    text: str
+    y: float
+
+@dataclass
+class BoilerplateReport:
+    """What was stripped from one document."""
+    pages: int = 0
+    lines_removed: int = 0
+    chars_before: int = 0
+    chars_after: int = 0
+    # Normalized text of each repeated line and the number of pages it was found on
+    repeated: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def tokens_saved(self) -> int:
+        return estimate_tokens(self.chars_before - self.chars_after)
+
+    def format(self) -> str:
+        return (f"{self.lines_removed} repeated lines removed from {self.pages} pages "
+                f"({len(self.repeated)} distinct), {self.chars_before - self.chars_after} chars, "
+                f"~{self.tokens_saved} tokens saved "
+                f"({self.tokens_saved / max(estimate_tokens(self.chars_before), 1):.1%})")
+
+def estimate_tokens(chars: int) -> int:
+    """Rough token count of a text length (about 4 characters per token)."""
+    return math.ceil(chars / 4)
+
+def line_key(text: str) -> str:
+    """Content used to match repeated lines; digits are ignored so "Trang 3" matches "Trang 4"."""
+    return _DIGITS_RE.sub('#', _WHITESPACE_RE.sub(' ', text).strip().lower())
+
+def page_lines(page: fitz.Page) -> List[PageLine]:
+    """Text lines of a page in get_text() order, with their positions."""
+    height = page.rect.height or 1.0
+    lines = []
+    data = page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)
+    for block in data['blocks']:
+        if block.get('type') != 0:
+            continue
+        for line in block['lines']:
+            y0, y1 = line['bbox'][1], line['bbox'][3]
+            lines.append(PageLine("".join(span['text'] for span in line['spans']), (y0 + y1) / 2 / height))
+    return lines
+
+def find_repeated(pages: Sequence[Sequence[PageLine]], min_ratio: float = 0.5,
+                  tolerance: float = 0.03) -> Dict[str, Tuple[float, int]]:
+    """Find lines printed at the same place on many pages.
+
+    Args:
+        pages: Lines of each page
+        min_ratio: Fraction of pages a line must appear on (at least 2 pages)
+        tolerance: Allowed drift of its vertical position, as a fraction of the page height
+
+    Returns:
+        Dict[str, Tuple[float, int]]: line_key -> (typical position, number of pages)
+    """
+    needed = max(2, math.ceil(min_ratio * len(pages)))
+    if len(pages) < needed:
+        return {}
+    seen: Dict[str, Dict[int, float]] = {}
+    samples: Dict[str, str] = {}
+    for page_no, lines in enumerate(pages):
+        for line in lines:
+            key = line_key(line.text)
+            if key:
+                seen.setdefault(key, {}).setdefault(page_no, line.y)
+                samples.setdefault(key, line.text)
+    repeated = {}
+    for key, positions in seen.items():
+        if len(positions) < needed:
+            continue
+        y = median(positions.values())
+        count = sum(1 for pos in positions.values() if abs(pos - y) <= tolerance)
+        if count < needed:
+            continue
+        # Never drop question or choice lines, even if they happen to repeat
+        if any(kind in (QUESTION, CHOICE) for kind, *_ in tokenize(samples[key])):
+            continue
+        repeated[key] = (y, count)
+    return repeated
+
+def strip_page_lines(pages: Sequence[Sequence[PageLine]], repeated: Dict[str, Tuple[float, int]],
+                     tolerance: float = 0.03) -> Tuple[List[str], int]:
+    """Rebuild each page's text without the repeated lines.
+
+    Returns:
+        Tuple[List[str], int]: Text of each page (same layout as page.get_text())
+            and the number of lines removed
+    """
+    texts = []
+    removed = 0
+    for lines in pages:
+        kept = []
+        for line in lines:
+            match = repeated.get(line_key(line.text))
+            if match is not None and abs(line.y - match[0]) <= tolerance:
+                removed += 1
+                continue
+            kept.append(line.text + "\n")
+        texts.append("".join(kept))
+    return texts, removed
+
+def extract_pages_without_boilerplate(pdf_path: str, min_ratio: float = 0.5,
+                                      tolerance: float = 0.03) -> Tuple[List[PageText], BoilerplateReport]:
+    """Extract page texts with headers, footers and watermarks removed.
+
+    Args:
+        pdf_path: Path to the PDF file
+        min_ratio: Fraction of pages a line must repeat on to be stripped
+        tolerance: Allowed drift of its vertical position, as a fraction of the page height
+
+    Returns:
+        Tuple[List[PageText], BoilerplateReport]: Stripped pages and what was removed
+    """
+    with open_pdf(pdf_path) as doc:
+        lines = [page_lines(page) for page in doc]
+    repeated = find_repeated(lines, min_ratio, tolerance)
+    texts, removed = strip_page_lines(lines, repeated, tolerance)
+    report = BoilerplateReport(
+        pages=len(lines),
+        lines_removed=removed,
+        chars_before=sum(len(line.text) + 1 for page in lines for line in page),
+        chars_after=sum(len(text) for text in texts),
+        repeated={key: count for key, (_, count) in repeated.items()},
+    )
+    pages = [PageText(number=n, text=text, digest=text_digest(text)) for n, text in enumerate(texts)]
+    return pages, report
+
+def iter_pages_without_boilerplate(pdf_path: str, report: BoilerplateReport, sample_pages: int = 8,
+                                   min_ratio: float = 0.5, tolerance: float = 0.03) -> Iterator[PageText]:
+    """Stream page texts with headers, footers and watermarks removed.
+
+    Repeated lines are learnt from the first sample_pages pages, which are
+    held back until then; every later page is stripped and yielded as soon
+    as it is read, so extraction can overlap the stages consuming it. Same
+    result as extract_pages_without_boilerplate for documents no longer
+    than the sample.
+
+    Args:
+        pdf_path: Path to the PDF file
+        report: Filled in while the pages are read
+        sample_pages: Number of leading pages used to find the repeated lines
+        min_ratio: Fraction of sampled pages a line must repeat on to be stripped
+        tolerance: Allowed drift of its vertical position, as a fraction of the page height
+
+    Yields:
+        PageText: Stripped pages in order
+    """
+    with open_pdf(pdf_path) as doc:
+        sample: List[List[PageLine]] = []
+        repeated: Dict[str, Tuple[float, int]] = {}
+        for page in doc:
+            lines = page_lines(page)
+            report.pages += 1
+            report.chars_before += sum(len(line.text) + 1 for line in lines)
+            if len(sample) < sample_pages:
+                sample.append(lines)
+                if len(sample) < sample_pages and page.number < len(doc) - 1:
+                    continue
+                repeated = find_repeated(sample, min_ratio, tolerance)
+                report.repeated = {key: count for key, (_, count) in repeated.items()}
+                batch, first = sample, page.number - len(sample) + 1
+            else:
+                batch, first = [lines], page.number
+            texts, removed = strip_page_lines(batch, repeated, tolerance)
+            report.lines_removed += removed
+            for number, text in enumerate(texts, first):
+                report.chars_after += len(text)
+                yield PageText(number=number, text=text, digest=text_digest(text))
@@ -0,0 +1,20 @@
+"""Locations of the bundled DejaVu fonts and their ReportLab registration."""
+from pathlib import Path
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+FONT_DIR = Path(__file__).resolve().parent.parent / "fonts" / "dejavu-fonts-ttf-2.37" / "dejavu-fonts-ttf-2.37" / "ttf"
+DEJAVU_REGULAR = FONT_DIR / "DejaVuSans.ttf"
+DEJAVU_BOLD = FONT_DIR / "DejaVuSans-Bold.ttf"
+
+def fonts_available() -> bool:
+    """Check that the regular and bold DejaVu fonts are present."""
+    return DEJAVU_REGULAR.exists() and DEJAVU_BOLD.exists()
+
+def register_dejavu() -> None:
+    """Register 'DejaVuSans' and 'DejaVuSans-Bold' with ReportLab (once)."""
+    registered = pdfmetrics.getRegisteredFontNames()
+    if 'DejaVuSans' not in registered:
+        pdfmetrics.registerFont(TTFont('DejaVuSans', str(DEJAVU_REGULAR)))
+    if 'DejaVuSans-Bold' not in registered:
+        pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', str(DEJAVU_BOLD)))
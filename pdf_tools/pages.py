@@ -0,0 +1,323 @@
+"""Page-level text extraction and incremental re-parsing of revised PDFs."""
+import hashlib
+import json
+import mmap
+import re
+from bisect import bisect_right
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+import fitz  # PyMuPDF
+
+from pdf_tools.tokenizer import QUESTION_MARKER_RE
+_WHITESPACE_RE = re.compile(r'\s+')
+
+@dataclass
+class PageText:
+    """Text of a single PDF page together with its content hash."""
+    number: int
+    text: str
+    digest: str
+
+@dataclass
+class QuestionBlock:
+    """Slice of the document starting at a question marker."""
+    text: str
+    first_page: int
+    last_page: int
+    digest: str
+
+def text_digest(text: str) -> str:
+    """Return the hex MD5 digest of a text (same hash as the JSON cache)."""
+    return hashlib.md5(text.encode()).hexdigest()
+
+@contextmanager
+def open_pdf(pdf_path: str) -> Iterator[fitz.Document]:
+    """Open a PDF through a read-only memory map instead of reading it into memory.
+
+    Args:
+        pdf_path: Path to the PDF file
+
+    Yields:
+        fitz.Document: Document backed by the memory-mapped file
+    """
+    with open(pdf_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        doc = fitz.open(stream=view, filetype="pdf")
+        try:
+            yield doc
+        finally:
+            doc.close()
+            view.release()
+
+def iter_page_texts(pdf_path: str) -> Iterator[PageText]:
+    """Yield the text of each page in order.
+
+    Args:
+        pdf_path: Path to the PDF file
+
+    Yields:
+        PageText: Text and hash of each page
+    """
+    with open_pdf(pdf_path) as doc:
+        for page in doc:
+            text = page.get_text()
+            yield PageText(number=page.number, text=text, digest=text_digest(text))
+
+def extract_pages(pdf_path: str) -> List[PageText]:
+    """Extract the text of every page.
+
+    Args:
+        pdf_path: Path to the PDF file
+
+    Returns:
+        List[PageText]: One entry per page
+    """
+    return list(iter_page_texts(pdf_path))
+
+def split_into_blocks(pages: List[PageText]) -> List[QuestionBlock]:
+    """Split the document into blocks starting at each question marker.
+
+    Text before the first marker (title, instructions) forms its own block.
+
+    Args:
+        pages: Extracted pages in order
+
+    Returns:
+        List[QuestionBlock]: Blocks with the range of pages they cover
+    """
+    starts = []
+    offset = 0
+    for page in pages:
+        starts.append(offset)
+        offset += len(page.text)
+    text = "".join(page.text for page in pages)
+    if not text:
+        return []
+
+    positions = [m.start() for m in QUESTION_MARKER_RE.finditer(text)]
+    if not positions or positions[0] != 0:
+        positions.insert(0, 0)
+    positions.append(len(text))
+
+    blocks = []
+    for start, end in zip(positions, positions[1:]):
+        if start == end:
+            continue
+        block_text = text[start:end]
+        # The marker's leading newline usually ends the previous page
+        head = start + 1 if block_text.startswith("\n") and end - start > 1 else start
+        blocks.append(QuestionBlock(
+            text=block_text,
+            first_page=pages[bisect_right(starts, head) - 1].number,
+            last_page=pages[bisect_right(starts, end - 1) - 1].number,
+            digest=text_digest(block_text)
+        ))
+    return blocks
+
+def changed_pages(pages: List[PageText], previous: Optional[Dict]) -> Set[int]:
+    """Return the numbers of pages whose content is not in the previous version.
+
+    Pages are compared by hash rather than by position, so inserting or
+    removing a page does not mark every following page as changed.
+
+    Args:
+        pages: Pages of the current version
+        previous: Manifest of the previous version, if any
+
+    Returns:
+        Set[int]: Page numbers to reprocess
+    """
+    known = set(previous.get('pages', [])) if previous else set()
+    return {page.number for page in pages if page.digest not in known}
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE_RE.sub(' ', text).strip().lower()
+
+def _choice_text(choice) -> str:
+    return str(choice[1] if isinstance(choice, (tuple, list)) else choice.get('text', ''))
+
+def _find_question(question: Dict, haystack: str, start: int, how: str) -> int:
+    """Position of a parsed question in a normalized block text, at or after start (-1 if absent).
+
+    how is one of _MATCHERS: the whole question text; all of its choices, in
+    any order since a page break can move them around; or, for a question
+    the LLM has corrected, most of its words at the start of the block.
+    """
+    text = _normalize(str(question.get('question', '')))
+    if how == 'text':
+        return haystack.find(text, start) if text else -1
+    if how == 'choices':
+        choices = [_normalize(_choice_text(choice)) for choice in question.get('choices', [])]
+        positions = [haystack.find(choice, start) for choice in choices if choice]
+        return min(positions) if positions and min(positions) >= 0 else -1
+    words = text.split()
+    if start or not words:
+        return -1
+    head = set(haystack[:len(text) + 20].split())
+    return 0 if sum(word in head for word in words) >= 0.8 * len(words) else -1
+
+# Ways to find a question in the text, tried in order over all remaining blocks
+_MATCHERS = ('text', 'choices', 'words')
+
+def _assign_to_blocks(questions: List[Dict], blocks: List[QuestionBlock]) -> Optional[List[List[Dict]]]:
+    """Attribute parsed questions to the blocks they were parsed from.
+
+    Questions come back in document order: each one is looked up after the
+    previous question, in the rest of its block (a block holds several
+    questions when a marker was not recognised) or in the following blocks.
+
+    Returns:
+        Optional[List[List[Dict]]]: Questions of each block, or None when a
+            question cannot be found in the text or the attribution is not
+            one question per block (a block holds several questions while a
+            neighbouring question block holds none)
+    """
+    assigned = [[] for _ in blocks]
+    haystacks = [_normalize(block.text) for block in blocks]
+    cursor, offset = -1, 0  # block and position of the previous question
+    for question in questions:
+        found = None
+        for how in _MATCHERS:
+            # Only the exact text may put a second question in the current block
+            for idx in range(max(cursor, 0) if how == 'text' else cursor + 1, len(blocks)):
+                pos = _find_question(question, haystacks[idx], offset if idx == cursor else 0, how)
+                if pos >= 0:
+                    found = idx, pos
+                    break
+            if found is not None:
+                break
+        if found is None:
+            return None
+        cursor, offset = found[0], found[1] + 1
+        assigned[cursor].append(question)
+    for idx, block in enumerate(blocks):
+        if len(assigned[idx]) > 1:
+            neighbours = [n for n in (idx - 1, idx + 1) if 0 <= n < len(blocks)]
+            if any(not assigned[n] and QUESTION_MARKER_RE.match(blocks[n].text) for n in neighbours):
+                return None
+    return assigned
+
+def parse_pages_incremental(
+    pages: List[PageText],
+    parse_fn: Callable[[str], List[Dict]],
+    previous: Optional[Dict] = None,
+    previous_questions: Optional[List[Dict]] = None
+) -> Tuple[List[Dict], Dict, int]:
+    """Parse questions, reusing cached results for blocks on unchanged pages.
+
+    Args:
+        pages: Pages of the current version
+        parse_fn: Function turning a text into a list of questions
+            (e.g. llm_parser.parse_questions_with_llm)
+        previous: Manifest of the previous version, if any
+        previous_questions: Cached questions of the previous version
+
+    Returns:
+        Tuple[List[Dict], Dict, int]: Questions, new manifest and number of
+            blocks that were re-parsed
+    """
+    blocks = split_into_blocks(pages)
+    changed = changed_pages(pages, previous)
+
+    reusable = {}
+    if previous and previous_questions is not None:
+        for entry in previous.get('blocks', []):
+            if not entry.get('reusable', True):
+                continue
+            start, end = entry['questions']
+            reusable.setdefault(entry['digest'], previous_questions[start:end])
+
+    results: List[Optional[List[Dict]]] = []
+    for block in blocks:
+        touched = range(block.first_page, block.last_page + 1)
+        if block.digest in reusable and not any(p in changed for p in touched):
+            results.append(reusable[block.digest])
+        else:
+            results.append(None)
+
+    # Re-parse each run of consecutive dirty blocks in a single call
+    dirty = [idx for idx, result in enumerate(results) if result is None]
+    runs = []
+    for idx in dirty:
+        if runs and runs[-1][-1] == idx - 1:
+            runs[-1].append(idx)
+        else:
+            runs.append([idx])
+    # Blocks whose questions could not be attributed: the whole run is kept on
+    # its first block and none of them is reused by the next version
+    unattributed: Dict[int, int] = {}  # block index -> last page of its run
+    for run in runs:
+        run_blocks = [blocks[idx] for idx in run]
+        parsed = parse_fn("".join(block.text for block in run_blocks))
+        assigned = _assign_to_blocks(parsed, run_blocks)
+        if assigned is None:
+            assigned = [parsed] + [[] for _ in run[1:]]
+            unattributed.update((idx, run_blocks[-1].last_page) for idx in run)
+        for idx, questions in zip(run, assigned):
+            results[idx] = questions
+
+    all_questions = []
+    manifest_blocks = []
+    for idx, (block, questions) in enumerate(zip(blocks, results)):
+        start = len(all_questions)
+        all_questions.extend(questions)
+        entry = {
+            'digest': block.digest,
+            'pages': [block.first_page, unattributed.get(idx, block.last_page)],
+            'questions': [start, len(all_questions)]
+        }
+        if idx in unattributed:
+            entry['reusable'] = False
+        manifest_blocks.append(entry)
+    manifest = {
+        'pages': [page.digest for page in pages],
+        'blocks': manifest_blocks
+    }
+    return all_questions, manifest, len(dirty)
+
+def questions_by_page(manifest: Dict) -> Dict[int, List[int]]:
+    """Map each page number to the indices of the questions found on it.
+
+    Args:
+        manifest: Manifest produced by parse_pages_incremental
+
+    Returns:
+        Dict[int, List[int]]: Page number -> question indices (0-based)
+    """
+    mapping: Dict[int, List[int]] = {}
+    for entry in manifest.get('blocks', []):
+        first, last = entry['pages']
+        for page in range(first, last + 1):
+            mapping.setdefault(page, []).extend(range(*entry['questions']))
+    return mapping
+
+def load_manifest(manifest_path: Path) -> Tuple[Optional[Dict], Optional[List[Dict]]]:
+    """Load a page manifest and the cached questions it refers to.
+
+    Args:
+        manifest_path: Path of the manifest JSON
+
+    Returns:
+        Tuple[Optional[Dict], Optional[List[Dict]]]: Manifest and questions,
+            or (None, None) if either file is missing or unreadable
+    """
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        cache_path = manifest_path.parent / manifest['cache']
+        questions = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, KeyError, ValueError):
+        return None, None
+    return manifest, questions
+
+def save_manifest(manifest_path: Path, manifest: Dict, cache_path: Path) -> None:
+    """Save a page manifest pointing at the questions cache JSON.
+
+    Args:
+        manifest_path: Path of the manifest JSON
+        manifest: Manifest produced by parse_pages_incremental
+        cache_path: Questions cache JSON (stored relative to the manifest)
+    """
+    data = dict(manifest, cache=Path(cache_path).name)
+    manifest_path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
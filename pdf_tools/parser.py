@@ -3,6 +3,7 @@ import re
 from typing import List, Dict, Tuple, Optional
 import fitz  # PyMuPDF
 from dataclasses import dataclass
+from pdf_tools.raster import RasterHighlightDetector, in_highlight_range
 
 @dataclass
 class TextSpan:
@@ -14,18 +15,26 @@ class TextSpan:
     color: Tuple[float, float, float]
     has_highlight: bool
     fill_color: Optional[Tuple[float, float, float]]
+    bbox: Optional[Tuple[float, float, float, float]] = None
+    origin: Optional[Tuple[float, float]] = None
+    page: int = 0
 
 class PDFParser:
     """Parser for extracting questions and answers from PDF files."""
     
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: str, detect_raster_highlights: bool = True, ocr_language: str = "vie"):
         """Initialize the PDF parser.
         
         Args:
             pdf_path: Path to the PDF file
+            detect_raster_highlights: Also detect highlighter marks drawn into
+                the page (fills, scanned images) by rendering each page
+            ocr_language: Tesseract language used for image-only pages
         """
         self.pdf_path = pdf_path
         self.doc = fitz.open(pdf_path)
+        self.raster = RasterHighlightDetector() if detect_raster_highlights else None
+        self.ocr_language = ocr_language
         
     def _is_yellow_highlight(self, color: Tuple[float, float, float]) -> bool:
         """Check if a color is within the yellow highlight range.
@@ -36,11 +45,8 @@ class PDFParser:
         Returns:
             bool: True if color is in yellow range
         """
-        r, g, b = color
-        # Check if color is close to #FCE94F (yellow)
-        return (0.95 <= r <= 1.0 and 
-                0.85 <= g <= 0.95 and 
-                0.25 <= b <= 0.35)
+        # Same colour ranges as the raster detector (yellow fills and #FCE94F)
+        return in_highlight_range(color)
     
     def _is_answer_span(self, span: TextSpan) -> bool:
         """Check if a text span represents a marked answer.
@@ -63,7 +69,8 @@ class PDFParser:
             List[TextSpan]: List of text spans with metadata
         """
         spans = []
-        for block in page.get_text("dict")["blocks"]:
+        highlights = [annot for annot in page.annots() if annot.type[0] == 8]  # Highlight annotations
+        for block in page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)["blocks"]:
             if "lines" not in block:
                 continue
                 
@@ -72,13 +79,11 @@ class PDFParser:
                     # Get highlight annotation if exists
                     has_highlight = False
                     fill_color = None
-                    for annot in page.annots():
-                        if annot.type[0] == 8:  # Highlight annotation
-                            rect = annot.rect
-                            if rect.intersects(fitz.Rect(span["bbox"])):
-                                has_highlight = True
-                                fill_color = annot.colors.get("stroke", None)
-                                break
+                    for annot in highlights:
+                        if annot.rect.intersects(fitz.Rect(span["bbox"])):
+                            has_highlight = True
+                            fill_color = annot.colors.get("stroke", None)
+                            break
                     
                     spans.append(TextSpan(
                         text=span["text"],
@@ -87,10 +92,59 @@ class PDFParser:
                         font_size=span["size"],
                         color=span["color"],
                         has_highlight=has_highlight,
-                        fill_color=fill_color
+                        fill_color=fill_color,
+                        bbox=tuple(span["bbox"]),
+                        origin=tuple(span["origin"]),
+                        page=page.number
                     ))
+        
+        if self.raster is not None:
+            if not spans:
+                # Image-only page (scan): take lines and their boxes from OCR
+                spans = self._ocr_spans(page)
+            if spans:
+                self._mark_raster_highlights(page, spans)
         return spans
     
+    def _ocr_spans(self, page: fitz.Page) -> List[TextSpan]:
+        """Build one span per OCR line of an image-only page.
+        
+        Args:
+            page: PyMuPDF page object
+            
+        Returns:
+            List[TextSpan]: Spans with the OCR word boxes merged per line
+        """
+        spans = []
+        for text, bbox in self.raster.ocr_lines(page, self.ocr_language):
+            spans.append(TextSpan(
+                text=text,
+                font_name="OCR",
+                is_bold=False,
+                font_size=bbox[3] - bbox[1],
+                color=(0.0, 0.0, 0.0),
+                has_highlight=False,
+                fill_color=None,
+                bbox=bbox,
+                origin=(bbox[0], bbox[3]),
+                page=page.number
+            ))
+        return spans
+    
+    def _mark_raster_highlights(self, page: fitz.Page, spans: List[TextSpan]) -> None:
+        """Flag spans lying on highlighter-coloured pixels of the rendered page.
+        
+        Args:
+            page: PyMuPDF page object
+            spans: Spans of the page, updated in place
+        """
+        mask = self.raster.page_mask(page)
+        if not mask.any:
+            return
+        for span in spans:
+            if not span.has_highlight and self.raster.is_highlighted(mask, span.bbox):
+                span.has_highlight = True
+    
     def _group_into_questions(self, spans: List[TextSpan]) -> List[Dict]:
         """Group text spans into questions and choices.
         
@@ -108,7 +162,7 @@ class PDFParser:
             text = span.text.strip()
             
             # Check for question number
-            if re.match(r'^\d+[\.\)]\s', text):
+            if re.match(r'^(?:\d+[\.\)]|Câu\s+\d+[:\.])(\s|$)', text):
                 if current_question is not None:
                     questions.append({
                         'question': current_question,
@@ -147,17 +201,24 @@ class PDFParser:
         
         return questions
     
-    def extract_questions(self) -> List[Dict]:
-        """Extract all questions and their choices from the PDF.
+    def extract_spans(self) -> List[TextSpan]:
+        """Extract text spans with their positions from every page.
         
         Returns:
-            List[Dict]: List of questions with choices and answers
+            List[TextSpan]: Spans of all pages in reading order
         """
         all_spans = []
         for page in self.doc:
             all_spans.extend(self._extract_spans(page))
+        return all_spans
+    
+    def extract_questions(self) -> List[Dict]:
+        """Extract all questions and their choices from the PDF.
         
-        questions = self._group_into_questions(all_spans)
+        Returns:
+            List[Dict]: List of questions with choices and answers
+        """
+        questions = self._group_into_questions(self.extract_spans())
         
         return questions
     
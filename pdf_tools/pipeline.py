@@ -0,0 +1,266 @@
+"""Pipelined exam processing: extraction, chunking, LLM parsing and writing overlap."""
+import hashlib
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pdf_tools.pages import PageText, iter_page_texts
+from pdf_tools.tokenizer import QUESTION_MARKER_RE
+from pdf_tools.writer import IncrementalExamWriter
+
+# Marks the end of a stage's output on its queue
+_DONE = object()
+
+@dataclass
+class PipelineStats:
+    """Counts and timings of one pipelined run."""
+    pages: int = 0
+    chunks: int = 0
+    questions: int = 0
+    wall_time: float = 0.0
+    # MD5 of the concatenated page texts, same as text_digest of the whole text
+    text_digest: str = ""
+    # Busy time of each stage; the LLM stage sums all of its workers
+    stage_time: Dict[str, float] = field(default_factory=dict)
+    # Highest number of items waiting on each queue
+    queue_peak: Dict[str, int] = field(default_factory=dict)
+
+    def format(self) -> str:
+        """Human-readable summary."""
+        lines = [f"{self.pages} pages, {self.chunks} chunks, {self.questions} questions in {self.wall_time:.2f}s"]
+        for stage, busy in self.stage_time.items():
+            lines.append(f"  {stage:<8}: {busy:7.2f}s busy")
+        lines.append(f"  queue peaks: {', '.join(f'{k}={v}' for k, v in self.queue_peak.items())}")
+        return "\n".join(lines)
+
+def chunk_pages(pages: Iterable[PageText], max_chunk_size: int = 2000) -> Iterator[str]:
+    """Group page texts into LLM chunks as soon as their questions are complete.
+
+    A question is complete once the next question marker has been seen, so
+    each chunk is yielded without waiting for the rest of the document. The
+    chunks follow the same rules as llm_parser.split_text_into_chunks.
+
+    Args:
+        pages: Page texts in document order
+        max_chunk_size: Target chunk size in characters
+
+    Yields:
+        str: Chunks that together cover the whole text
+    """
+    chunk = ""      # chunk being filled
+    pending = ""    # text after the last marker seen: an unfinished question
+    for page in pages:
+        pending += page.text
+        starts = [m.start() for m in QUESTION_MARKER_RE.finditer(pending)]
+        # pending[0] may itself be a marker; only later markers close a question
+        cuts = [pos for pos in starts if pos > 0]
+        last = 0
+        for pos in cuts:
+            block = pending[last:pos]
+            if chunk and len(chunk) + len(block) > max_chunk_size:
+                yield chunk
+                chunk = ""
+            chunk += block
+            last = pos
+        pending = pending[last:]
+    if pending:
+        if chunk and len(chunk) + len(pending) > max_chunk_size:
+            yield chunk
+            chunk = ""
+        chunk += pending
+    if chunk:
+        yield chunk
+
+class _Stage:
+    """Bookkeeping shared by the pipeline threads."""
+
+    def __init__(self, stats: PipelineStats):
+        self.stats = stats
+        self.error: Optional[BaseException] = None
+        self.failed = threading.Event()
+        self._lock = threading.Lock()
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stats.stage_time[stage] = self.stats.stage_time.get(stage, 0.0) + seconds
+
+    def fail(self, exc: BaseException) -> None:
+        with self._lock:
+            if self.error is None:
+                self.error = exc
+        self.failed.set()
+
+    def put(self, name: str, q: queue.Queue, item) -> None:
+        """Put with backpressure; gives up when another stage failed."""
+        while not self.failed.is_set():
+            try:
+                q.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            with self._lock:
+                self.stats.queue_peak[name] = max(self.stats.queue_peak.get(name, 0), q.qsize())
+            return
+
+    def acquire(self, semaphore: threading.Semaphore) -> None:
+        while not self.failed.is_set() and not semaphore.acquire(timeout=0.1):
+            pass
+
+    def get(self, q: queue.Queue):
+        while not self.failed.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+def run_pipeline(pdf_path: str, parse_fn: Callable[[str], List[Dict]], original_path: str, answer_path: Optional[str],
+                 workers: int = 4, max_chunk_size: int = 2000, queue_size: int = 8,
+                 pages: Optional[Iterable[PageText]] = None) -> Tuple[List[Dict], PipelineStats]:
+    """Extract, parse and write an exam with all stages running concurrently.
+
+    page extraction -> chunker -> `workers` LLM threads -> in-order writer,
+    connected by queues holding at most `queue_size` items, so a slow stage
+    holds the earlier ones back instead of letting text pile up in memory.
+
+    Args:
+        pdf_path: Source PDF
+        parse_fn: Parses one chunk into questions (e.g. parse_questions_with_llm)
+        original_path: Output exam without answers
+        answer_path: Output exam with the correct letters in bold (None to skip it)
+        workers: Number of concurrent parse_fn calls
+        max_chunk_size: Target chunk size in characters
+        queue_size: Capacity of each queue
+        pages: Page texts to use instead of reading pdf_path (e.g. OCR output)
+
+    Returns:
+        Tuple[List[Dict], PipelineStats]: Questions in document order and run statistics
+    """
+    stats = PipelineStats()
+    state = _Stage(stats)
+    page_queue = queue.Queue(maxsize=queue_size)
+    chunk_queue = queue.Queue(maxsize=queue_size)
+    result_queue = queue.Queue(maxsize=queue_size)
+    # Chunks handed out but not yet written, including those finished out of
+    # order and waiting for an earlier one, so the reorder buffer is bounded too
+    in_flight = threading.Semaphore(workers + 2 * queue_size)
+
+    def extract():
+        digest = hashlib.md5()
+        try:
+            source = iter(pages if pages is not None else iter_page_texts(pdf_path))
+            while True:
+                started = time.perf_counter()
+                page = next(source, None)
+                state.add_time("extract", time.perf_counter() - started)
+                if page is None:
+                    break
+                stats.pages += 1
+                digest.update(page.text.encode())
+                state.put("pages", page_queue, page)
+            stats.text_digest = digest.hexdigest()
+        except BaseException as exc:
+            state.fail(exc)
+        finally:
+            state.put("pages", page_queue, _DONE)
+
+    waited = [0.0]  # time the chunker spent blocked on the page queue
+
+    def page_source():
+        while True:
+            started = time.perf_counter()
+            page = state.get(page_queue)
+            waited[0] += time.perf_counter() - started
+            if page is _DONE:
+                return
+            yield page
+
+    def chunk():
+        try:
+            source = chunk_pages(page_source(), max_chunk_size)
+            seq = 0
+            while True:
+                started, waited[0] = time.perf_counter(), 0.0
+                text = next(source, None)
+                state.add_time("chunk", time.perf_counter() - started - waited[0])
+                if text is None:
+                    break
+                state.acquire(in_flight)
+                state.put("chunks", chunk_queue, (seq, text))
+                seq += 1
+            stats.chunks = seq
+        except BaseException as exc:
+            state.fail(exc)
+        finally:
+            for _ in range(workers):
+                state.put("chunks", chunk_queue, _DONE)
+
+    def parse():
+        try:
+            while True:
+                item = state.get(chunk_queue)
+                if item is _DONE:
+                    break
+                seq, text = item
+                started = time.perf_counter()
+                questions = parse_fn(text)
+                state.add_time("llm", time.perf_counter() - started)
+                state.put("results", result_queue, (seq, questions))
+        except BaseException as exc:
+            state.fail(exc)
+        finally:
+            state.put("results", result_queue, _DONE)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=extract, daemon=True), threading.Thread(target=chunk, daemon=True)]
+    threads += [threading.Thread(target=parse, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    all_questions: List[Dict] = []
+    waiting: Dict[int, List[Dict]] = {}
+    next_seq = 0
+    finished_workers = 0
+    writer = IncrementalExamWriter(original_path, answer_path)
+    try:
+        while finished_workers < workers:
+            item = state.get(result_queue)
+            if item is _DONE:
+                if state.failed.is_set():
+                    break
+                finished_workers += 1
+                continue
+            seq, questions = item
+            waiting[seq] = questions
+            # Chunks finish out of order; write them in document order
+            write_started = time.perf_counter()
+            while next_seq in waiting:
+                for question in waiting.pop(next_seq):
+                    writer.add(question)
+                    all_questions.append(question)
+                next_seq += 1
+                in_flight.release()
+            state.add_time("write", time.perf_counter() - write_started)
+    except BaseException as exc:
+        # Stop the other stages, which would otherwise keep polling their queues
+        state.fail(exc)
+        writer.discard()
+        for thread in threads:
+            thread.join(timeout=1.0)
+        raise
+    if state.error is None:
+        close_started = time.perf_counter()
+        writer.close()
+        state.add_time("write", time.perf_counter() - close_started)
+    else:
+        # Do not leave a truncated exam in place of the outputs
+        writer.discard()
+
+    for thread in threads:
+        thread.join(timeout=1.0)
+    if state.error is not None:
+        raise state.error
+    stats.questions = len(all_questions)
+    stats.wall_time = time.perf_counter() - started
+    return all_questions, stats
@@ -0,0 +1,121 @@
+"""Raster-based detection of highlight markers baked into the page image."""
+from typing import List, Sequence, Tuple
+import fitz  # PyMuPDF
+import numpy as np
+
+# (low, high) RGB bounds in 0..1 of colours treated as a highlighter marker.
+# Covers pure yellow (1, 1, 0) fills as well as the paler #FCE94F tone.
+HIGHLIGHT_RANGES: List[Tuple[Tuple[float, float, float], Tuple[float, float, float]]] = [
+    ((0.80, 0.70, 0.00), (1.00, 1.00, 0.55)),
+]
+
+def in_highlight_range(color: Sequence[float], ranges=HIGHLIGHT_RANGES) -> bool:
+    """Check if a single RGB colour (0..1) falls in one of the highlight ranges."""
+    return any(all(lo <= c <= hi for c, lo, hi in zip(color, low, high)) for low, high in ranges)
+
+class HighlightMask:
+    """Boolean mask of highlight-coloured pixels of one rendered page."""
+
+    def __init__(self, mask: np.ndarray, scale: float):
+        """Initialize the mask.
+
+        Args:
+            mask: (height, width) boolean array of highlight pixels
+            scale: Pixels per PDF point used when rendering
+        """
+        self.mask = mask
+        self.scale = scale
+        self.any = bool(mask.any())
+
+    def coverage(self, bbox: Sequence[float]) -> float:
+        """Return the fraction of highlighted pixels inside a bbox given in PDF points.
+
+        Args:
+            bbox: (x0, y0, x1, y1) in page coordinates
+
+        Returns:
+            float: Value between 0 and 1
+        """
+        if not self.any:
+            return 0.0
+        height, width = self.mask.shape
+        x0 = min(max(int(bbox[0] * self.scale), 0), width)
+        y0 = min(max(int(bbox[1] * self.scale), 0), height)
+        x1 = min(max(int(np.ceil(bbox[2] * self.scale)), 0), width)
+        y1 = min(max(int(np.ceil(bbox[3] * self.scale)), 0), height)
+        area = (x1 - x0) * (y1 - y0)
+        if area <= 0:
+            return 0.0
+        return np.count_nonzero(self.mask[y0:y1, x0:x1]) / area
+
+class RasterHighlightDetector:
+    """Detects highlight markers by rendering pages and thresholding their colours."""
+
+    def __init__(self, dpi: int = 72, min_coverage: float = 0.25, ranges=HIGHLIGHT_RANGES):
+        """Initialize the detector.
+
+        Args:
+            dpi: Rendering resolution; 72 dpi is enough to see a marker stroke
+            min_coverage: Fraction of a bbox that must be highlighted to count
+            ranges: (low, high) RGB bounds of highlight colours, in 0..1
+        """
+        self.dpi = dpi
+        self.min_coverage = min_coverage
+        self._low = np.array([[int(c * 255) for c in low] for low, _ in ranges], dtype=np.uint8)
+        self._high = np.array([[int(np.ceil(c * 255)) for c in high] for _, high in ranges], dtype=np.uint8)
+
+    def page_mask(self, page: fitz.Page) -> HighlightMask:
+        """Render a page once and build its highlight mask.
+
+        Args:
+            page: PyMuPDF page object
+
+        Returns:
+            HighlightMask: Mask of highlight-coloured pixels
+        """
+        pix = page.get_pixmap(dpi=self.dpi, colorspace=fitz.csRGB, alpha=False)
+        rows = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+        rgb = rows[:, :pix.width * 3].reshape(pix.height, pix.width, 3)
+        channels = [rgb[:, :, c] for c in range(3)]
+        mask = np.zeros((pix.height, pix.width), dtype=bool)
+        for low, high in zip(self._low, self._high):
+            in_range = (channels[0] >= low[0]) & (channels[0] <= high[0])
+            for channel, lo, hi in zip(channels[1:], low[1:], high[1:]):
+                in_range &= (channel >= lo) & (channel <= hi)
+            mask |= in_range
+        return HighlightMask(mask, self.dpi / 72.0)
+
+    def is_highlighted(self, mask: HighlightMask, bbox: Sequence[float]) -> bool:
+        """Check whether a bbox is covered by a highlight marker."""
+        return mask.coverage(bbox) >= self.min_coverage
+
+    @staticmethod
+    def ocr_lines(page: fitz.Page, language: str = "vie", dpi: int = 200) -> List[Tuple[str, Tuple[float, float, float, float]]]:
+        """OCR an image-only page and return its text lines with their bboxes.
+
+        Requires Tesseract to be installed (see PyMuPDF's get_textpage_ocr);
+        returns an empty list when it is not available.
+
+        Args:
+            page: PyMuPDF page object
+            language: Tesseract language code
+            dpi: OCR resolution
+
+        Returns:
+            List[Tuple[str, Tuple[float, float, float, float]]]: (text, bbox) per line
+        """
+        try:
+            textpage = page.get_textpage_ocr(language=language, dpi=dpi, full=True)
+        except (RuntimeError, ValueError):
+            return []
+        lines = {}
+        for x0, y0, x1, y1, word, block_no, line_no, _ in page.get_text("words", textpage=textpage):
+            key = (block_no, line_no)
+            if key not in lines:
+                lines[key] = [[word], [x0, y0, x1, y1]]
+                continue
+            words, bbox = lines[key]
+            words.append(word)
+            bbox[0], bbox[1] = min(bbox[0], x0), min(bbox[1], y0)
+            bbox[2], bbox[3] = max(bbox[2], x1), max(bbox[3], y1)
+        return [(" ".join(words), tuple(bbox)) for words, bbox in lines.values()]
@@ -0,0 +1,99 @@
+"""Single-pass tokenizer for plain-text multiple choice exams."""
+import re
+from typing import Dict, Iterator, List, Optional, Tuple
+
+QUESTION = 'question'
+CHOICE = 'choice'
+ANSWER = 'answer'
+KEY_HEADER = 'key_header'
+TEXT = 'text'
+
+# One alternation classifies every line in a single scan of the document:
+#   "Câu 12: ...", "12. ...", "12) ..."  -> question
+#   "A. ...", "B) ..."                   -> choice
+#   "1-A", "1-A  2-B, 3-C"               -> answer key entries
+#   "ĐÁP ÁN", "Bảng đáp án:"             -> start of the answer table (alone on its line,
+#                                           so a wrapped "đáp án sau..." stays text)
+#   anything else                        -> continuation text
+_LINE_RE = re.compile(r'''
+    ^[ \t]*(?:
+        (?:Câu[ \t]+(?P<qnum>\d+)[ \t]*[:.]|(?P<qnum2>\d+)[.)](?![^ \t\r\n]))[ \t]*(?P<qtext>[^\n]*)
+      | (?P<letter>[A-G])[.)][ \t]*(?P<ctext>[^\n]*)
+      | (?P<key>\d+[ \t]*-[ \t]*[A-G](?:[ \t,;|]+\d+[ \t]*-[ \t]*[A-G])*)[ \t,;|\r]*$
+      | (?P<keyhead>(?i:(?:bảng[ \t]+)?đáp[ \t]+án)[ \t]*:?)[ \t\r]*$
+      | (?P<text>[^\n]+)
+    )
+''', re.MULTILINE | re.VERBOSE)
+# Start of a question block ("Câu 1:", "1.", "1)"), used to cut text into
+# chunks for the LLM without classifying every line
+QUESTION_MARKER_RE = re.compile(r'(?:^|\n)(?:\d+[\.\)]|Câu\s+\d+[:\.])')
+_KEY_PAIR_RE = re.compile(r'(\d+)[ \t]*-[ \t]*([A-G])')
+
+# (kind, number, letter, text); plain tuples keep the per-line cost low
+Token = Tuple[str, Optional[int], Optional[str], str]
+
+def tokenize(text: str) -> Iterator[Token]:
+    """Yield question, choice, answer-key and text tokens in document order.
+
+    Args:
+        text: Plain text of the exam
+
+    Yields:
+        Token: One token per non-empty line (one per entry for answer keys)
+    """
+    for m in _LINE_RE.finditer(text):
+        qnum, qnum2, qtext, letter, ctext, key, keyhead, body = m.groups()
+        if qtext is not None:
+            yield (QUESTION, int(qnum or qnum2), None, qtext.rstrip())
+        elif ctext is not None:
+            yield (CHOICE, None, letter, ctext.rstrip())
+        elif body is not None:
+            body = body.rstrip()
+            if body:
+                yield (TEXT, None, None, body)
+        elif key is not None:
+            for num, key_letter in _KEY_PAIR_RE.findall(key):
+                yield (ANSWER, int(num), key_letter, '')
+        else:
+            yield (KEY_HEADER, None, None, keyhead.rstrip())
+
+def parse_questions_and_answers(text: str) -> Tuple[List[Dict], Dict[int, str]]:
+    """Parse questions, choices and the answer key from exam text.
+
+    Lines that follow a question or choice without a marker of their own are
+    treated as its continuation, so wrapped questions and choices are kept
+    whole.
+
+    Args:
+        text: Plain text of the exam
+
+    Returns:
+        Tuple[List[Dict], Dict[int, str]]: Questions as
+            {'question': str, 'choices': [(letter, text), ...]} and the
+            answer key mapping question number -> letter
+    """
+    questions = []
+    answer_key = {}
+    current = choices = None
+    for kind, number, letter, body in tokenize(text):
+        if kind is CHOICE:
+            if current is not None:
+                choices.append((letter, body))
+        elif kind is QUESTION:
+            choices = []
+            current = {'question': body, 'choices': choices}
+            questions.append(current)
+        elif kind is TEXT:
+            if current is None:
+                continue
+            if choices:
+                prev_letter, prev_text = choices[-1]
+                choices[-1] = (prev_letter, prev_text + ' ' + body)
+            else:
+                current['question'] += ' ' + body
+        elif kind is ANSWER:
+            answer_key[number] = letter
+            current = None
+        else:
+            current = None
+    return questions, answer_key
@@ -0,0 +1,264 @@
+"""Shuffled exam variants assembled from question blocks laid out once."""
+import io
+import random
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph
+
+from pdf_tools.fonts import register_dejavu
+from pdf_tools.writer import (
+    CHOICE_INDENT, CHOICE_STYLE, MARGIN_BOTTOM, MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, PAGE_SIZE,
+    QUESTION_GAP, QUESTION_STYLE,
+)
+
+LETTERS = "ABCDEFGHIJ"
+FONTS = ('DejaVuSans', 'DejaVuSans-Bold')
+
+# Choices that refer to other choices by position stay where they are
+_PINNED_CHOICE_RE = re.compile(
+    r'(?i)tất cả|cả\s+(?:hai|ba|bốn)|đều\s+(?:đúng|sai)|không\s+có\s+đáp\s+án|'
+    r'all of the above|none of the above|\b[A-J]\s*(?:,|và|hoặc|and|or)\s*[A-J]\b'
+)
+
+@dataclass
+class QuestionLayout:
+    """One question wrapped once: its body and choice paragraphs with their heights."""
+    body: Paragraph
+    choices: List[Paragraph]
+    correct: Optional[int]
+    pinned: List[bool] = field(default_factory=list)
+
+    @property
+    def height(self) -> float:
+        return self.body.height + sum(p.height for p in self.choices) + QUESTION_GAP
+
+@dataclass
+class Variant:
+    """A shuffled exam: question order, choice order of each question and answer key."""
+    code: str
+    order: List[int]
+    choice_orders: List[List[int]]
+    answers: Dict[int, str]
+
+def _choice_parts(choice) -> Tuple[str, bool]:
+    if isinstance(choice, (tuple, list)):
+        return choice[1], False
+    return choice.get('text', ''), bool(choice.get('is_correct'))
+
+def _choice_letter(choice, position: int) -> str:
+    if isinstance(choice, (tuple, list)):
+        return choice[0]
+    return choice.get('letter') or LETTERS[position]
+
+def permute_choices(n_choices: int, pinned: Sequence[bool], rng: random.Random) -> List[int]:
+    """Shuffle choice indices, keeping pinned choices at their original position."""
+    free = [i for i in range(n_choices) if not pinned[i]]
+    shuffled = free[:]
+    rng.shuffle(shuffled)
+    moved = dict(zip(free, shuffled))
+    return [moved.get(i, i) for i in range(n_choices)]
+
+def make_variant(questions_layout: Sequence[QuestionLayout], index: int, seed: int,
+                 shuffle_questions: bool = True, shuffle_choices: bool = True,
+                 first_code: int = 101) -> Variant:
+    """Draw the permutations of one variant; the same (seed, index) always gives the same variant."""
+    rng = random.Random(f"{seed}-{index}")
+    order = list(range(len(questions_layout)))
+    if shuffle_questions:
+        rng.shuffle(order)
+    choice_orders = []
+    answers = {}
+    for number, q_idx in enumerate(order, 1):
+        layout = questions_layout[q_idx]
+        n = len(layout.choices)
+        perm = permute_choices(n, layout.pinned, rng) if shuffle_choices else list(range(n))
+        choice_orders.append(perm)
+        if layout.correct is not None:
+            answers[number] = LETTERS[perm.index(layout.correct)]
+    return Variant(code=str(first_code + index), order=order, choice_orders=choice_orders, answers=answers)
+
+class ExamLayout:
+    """Lays out every question block, choice and label once and draws shuffled variants from them.
+
+    Question numbers and choice letters live in a fixed-width gutter, so a
+    block's wrapped lines do not depend on where it ends up in a variant.
+    """
+
+    def __init__(self, questions: List[Dict], title: str = ""):
+        """Wrap all paragraphs once.
+
+        Args:
+            questions: Questions in the cached JSON format (choices as dicts with
+                is_correct, or (letter, text) tuples)
+            title: Printed at the top of the first page of each variant
+        """
+        register_dejavu()
+        self.title = title
+        self.page_width, self.page_height = PAGE_SIZE
+        frame_width = self.page_width - MARGIN_LEFT - MARGIN_RIGHT
+        question_style = QUESTION_STYLE
+        # Choices are placed next to their letter label, not indented by the style
+        choice_style = ParagraphStyle('Choice', parent=CHOICE_STYLE, leftIndent=0)
+        self.title_style = ParagraphStyle('Title', fontName='DejaVuSans-Bold', fontSize=12, leading=16)
+
+        # Labels are the same in every variant: "Câu 1:" .. "Câu n:" and "A." .. "J."
+        label_style = ParagraphStyle('QuestionLabel', parent=question_style, fontName='DejaVuSans-Bold')
+        self.number_labels = [Paragraph(f"Câu {i}:", label_style) for i in range(1, len(questions) + 1)]
+        self.number_width = stringWidth(f"Câu {len(questions)}:", 'DejaVuSans-Bold', 12) + 4
+        for label in self.number_labels:
+            label.wrap(self.number_width, self.page_height)
+        max_choices = max((len(q.get('choices', [])) for q in questions), default=0)
+        self.letter_labels = [Paragraph(f"{LETTERS[i]}.", choice_style) for i in range(min(max_choices, len(LETTERS)))]
+        self.letter_width = max((stringWidth(f"{letter}.", 'DejaVuSans', 11) for letter in LETTERS), default=0) + 4
+        for label in self.letter_labels:
+            label.wrap(self.letter_width, self.page_height)
+
+        body_width = frame_width - self.number_width
+        choice_width = frame_width - CHOICE_INDENT - self.letter_width
+        self.blocks: List[QuestionLayout] = []
+        for q in questions:
+            body = Paragraph(escape(q['question']), question_style)
+            body.wrap(body_width, self.page_height)
+            choices, pinned, correct = [], [], None
+            answer = q.get('answer')
+            for i, choice in enumerate(q.get('choices', [])[:len(LETTERS)]):
+                text, is_correct = _choice_parts(choice)
+                is_correct = is_correct or (answer is not None and _choice_letter(choice, i) == answer)
+                paragraph = Paragraph(escape(text or ''), choice_style)
+                paragraph.wrap(choice_width, self.page_height)
+                choices.append(paragraph)
+                pinned.append(bool(_PINNED_CHOICE_RE.search(text or '')))
+                if is_correct and correct is None:
+                    correct = i
+            self.blocks.append(QuestionLayout(body, choices, correct, pinned))
+
+        # Glyph codes of a TrueType subset are assigned per document in order of
+        # first use. Assigning every character of the exam up front in a fixed
+        # order makes them identical in all documents, so the content stream of
+        # each paragraph can be recorded once and pasted into every variant.
+        texts = [self.title, "0123456789— Mã đề"]
+        texts += [q['question'] for q in questions]
+        texts += [_choice_parts(ch)[0] or '' for q in questions for ch in q.get('choices', [])]
+        texts += [f"Câu {len(questions)}:", LETTERS, "."]
+        self._charset = "".join(sorted(set("".join(texts))))
+        scratch = canvas.Canvas(io.BytesIO(), pagesize=PAGE_SIZE)
+        self._prime_fonts(scratch)
+        self._ops: Dict[int, str] = {}
+        paragraphs = self.number_labels + self.letter_labels
+        paragraphs += [p for block in self.blocks for p in [block.body] + block.choices]
+        for paragraph in paragraphs:
+            paragraph.drawOn(scratch, 0, 0)
+            self._ops[id(paragraph)] = scratch.getCurrentPageContent()
+            scratch.showPage()
+
+    def _prime_fonts(self, c: canvas.Canvas) -> None:
+        """Assign subset codes for every character of the exam, in a fixed order."""
+        doc = c._doc
+        for name in FONTS:
+            font = pdfmetrics.getFont(name)
+            for subset, _ in font.splitString(self._charset, doc):
+                font.getSubsetInternalName(subset, doc)
+
+    def variant(self, index: int, seed: int, **options) -> Variant:
+        """Permutations and answer key of variant number `index`."""
+        return make_variant(self.blocks, index, seed, **options)
+
+    def render(self, variant: Variant, output_path: str) -> None:
+        """Assemble a variant from the recorded paragraphs; nothing is wrapped or drawn again."""
+        c = canvas.Canvas(output_path, pagesize=PAGE_SIZE)
+        self._prime_fonts(c)
+        c.setTitle(f"{self.title} - Mã đề {variant.code}".strip(" -"))
+        top = self.page_height - MARGIN_TOP
+        x_body = MARGIN_LEFT + self.number_width
+        x_letter = MARGIN_LEFT + CHOICE_INDENT
+        x_choice = x_letter + self.letter_width
+
+        header = Paragraph(f"{escape(self.title)} — Mã đề {variant.code}".strip(" —"), self.title_style)
+        _, header_height = header.wrap(self.page_width - MARGIN_LEFT - MARGIN_RIGHT, self.page_height)
+        header.drawOn(c, MARGIN_LEFT, top - header_height)
+        y = top - header_height - QUESTION_GAP
+
+        for number, (q_idx, perm) in enumerate(zip(variant.order, variant.choice_orders), 1):
+            block = self.blocks[q_idx]
+            # Keep a question with its choices unless it does not fit on any page
+            if y - block.height < MARGIN_BOTTOM and y < top:
+                c.showPage()
+                y = top
+            label = self.number_labels[number - 1]
+            y = self._draw_row(c, y, top, (MARGIN_LEFT, label), (x_body, block.body))
+            for position, choice_idx in enumerate(perm):
+                y = self._draw_row(c, y, top, (x_letter, self.letter_labels[position]),
+                                   (x_choice, block.choices[choice_idx]))
+            y -= QUESTION_GAP
+        c.showPage()
+        c.save()
+
+    def _draw_row(self, c: canvas.Canvas, y: float, top: float, *cells: Tuple[float, Paragraph]) -> float:
+        height = max(p.height for _, p in cells)
+        if y - height < MARGIN_BOTTOM and y < top:
+            c.showPage()
+            y = top
+        for x, paragraph in cells:
+            c.addLiteral(f"q 1 0 0 1 {x:.2f} {y - paragraph.height:.2f} cm\n{self._ops[id(paragraph)]}\nQ")
+        return y - height
+
+# Per-process layout, built once by the pool initializer
+_WORKER_LAYOUT: Optional[ExamLayout] = None
+
+def _init_worker(questions: List[Dict], title: str) -> None:
+    global _WORKER_LAYOUT
+    _WORKER_LAYOUT = ExamLayout(questions, title)
+
+def _render_worker(task: Tuple[int, int, Dict, str]) -> Variant:
+    index, seed, options, output_path = task
+    variant = _WORKER_LAYOUT.variant(index, seed, **options)
+    _WORKER_LAYOUT.render(variant, output_path)
+    return variant
+
+def generate_variants(questions: List[Dict], n_variants: int, output_dir: str, seed: int = 0,
+                      title: str = "", workers: int = 1, shuffle_questions: bool = True,
+                      shuffle_choices: bool = True, first_code: int = 101) -> List[Tuple[Variant, str]]:
+    """Write n shuffled variants of an exam, each with its answer key.
+
+    Question blocks are laid out once (once per worker process when
+    workers > 1) and every variant only draws them in a new order.
+
+    Args:
+        questions: Questions in the cached JSON format
+        n_variants: Number of variants to write
+        output_dir: Directory for the variant PDFs (ma_de_<code>.pdf)
+        seed: Base seed; variant i always gets the same permutation for a given seed
+        title: Exam title printed on each variant
+        workers: Worker processes (1 renders in this process)
+        shuffle_questions: Permute question order
+        shuffle_choices: Permute choices (choices such as "Tất cả đều đúng" stay in place)
+        first_code: Code of the first variant
+
+    Returns:
+        List[Tuple[Variant, str]]: Each variant and the path of its PDF, in index order
+    """
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    options = dict(shuffle_questions=shuffle_questions, shuffle_choices=shuffle_choices, first_code=first_code)
+    tasks = [(i, seed, options, str(out / f"ma_de_{first_code + i}.pdf")) for i in range(n_variants)]
+    if workers > 1 and n_variants > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(questions, title)) as pool:
+            variants = list(pool.map(_render_worker, tasks, chunksize=max(1, n_variants // (workers * 4))))
+    else:
+        layout = ExamLayout(questions, title)
+        variants = []
+        for index, task_seed, task_options, path in tasks:
+            variant = layout.variant(index, task_seed, **task_options)
+            layout.render(variant, path)
+            variants.append(variant)
+    return [(variant, task[3]) for variant, task in zip(variants, tasks)]
@@ -1,62 +1,120 @@
 """PDF generation utilities for creating output files."""
-from typing import List, Dict
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional, Tuple
 from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.lib.enums import TA_LEFT
+from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import Paragraph, Spacer
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
 from reportlab.lib.units import inch
-import os
-import re
+import html
+import io
+import fitz  # PyMuPDF
 
-class PDFWriter:
+from pdf_tools.fonts import DEJAVU_BOLD, DEJAVU_REGULAR, FONT_DIR, register_dejavu
+
+# Page geometry and styles of auto_exam_pdf.make_pdf, shared by every layout
+# that reproduces it (the backends below, IncrementalExamWriter, variants)
+PAGE_SIZE = A4
+MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 30, 30, 30, 18
+# Padding SimpleDocTemplate's frame adds inside the margins
+FRAME_PADDING = 6
+QUESTION_GAP = 8
+CHOICE_INDENT = 20
+QUESTION_STYLE = ParagraphStyle('Question', fontName='DejaVuSans', fontSize=12, leading=16, alignment=TA_LEFT)
+CHOICE_STYLE = ParagraphStyle('Choice', fontName='DejaVuSans', fontSize=11, leading=14,
+                              leftIndent=CHOICE_INDENT, alignment=TA_LEFT)
+
+def iter_choices(idx: int, question: Dict, answer_key: Dict[int, str],
+                 show_answer: bool) -> Iterator[Tuple[str, str, bool]]:
+    """Yield (letter, text, is_correct) for each choice, as make_pdf decides them.
+
+    Choices may be (letter, text) tuples, judged by answer_key, or dicts with
+    an is_correct flag.
+    """
+    for ch in question.get('choices', []):
+        if isinstance(ch, tuple):
+            choice_letter, text_choice = ch
+            is_correct = (answer_key.get(idx) == choice_letter) if show_answer else False
+        else:
+            choice_letter = ch.get('letter')
+            text_choice = ch.get('text')
+            is_correct = ch.get('is_correct', False) or (answer_key.get(idx) == choice_letter)
+        yield choice_letter, text_choice, show_answer and is_correct
+
+class ExamWriter(ABC):
+    """Interface of the output backends.
+
+    A backend renders the exam once without answers and once with the
+    correct letters in bold; pick one with get_writer(name).
+    """
+
+    @abstractmethod
+    def write_exam(self, questions: List[Dict], output_path: str, show_answer: bool = False,
+                   answer_key: Optional[Dict[int, str]] = None) -> None:
+        """Render the questions to a PDF.
+
+        Args:
+            questions: Parsed questions (choices as dicts or (letter, text) tuples)
+            output_path: Path to save the output PDF
+            show_answer: Bold the letter of the correct choice
+            answer_key: Question number (1-based) -> correct letter, for tuple choices
+        """
+
+    def write_original(self, questions: List[Dict], output_path: str):
+        """Write the original questions without answer markers."""
+        self.write_exam(questions, output_path, show_answer=False)
+
+    def write_answer_key(self, questions: List[Dict], output_path: str):
+        """Write the questions with the correct answers marked."""
+        self.write_exam(questions, output_path, show_answer=True)
+
+class PDFWriter(ExamWriter):
     """Writer for generating output PDF files."""
     
     def __init__(self):
         """Initialize the PDF writer with necessary fonts."""
-        # Use Arial Unicode MS font
-        font_path = "C:\\Windows\\Fonts\\arial.ttf"
-        
-        # Register fonts
-        pdfmetrics.registerFont(TTFont('Arial', font_path))
-        pdfmetrics.registerFont(TTFont('Arial-Bold', font_path))
+        # Bundled DejaVu fonts (Vietnamese glyphs, available on every OS)
+        register_dejavu()
         
         # Create styles
         self.styles = getSampleStyleSheet()
         self.styles.add(ParagraphStyle(
             name='Question',
-            fontName='Arial',
+            fontName='DejaVuSans',
             fontSize=12,
             leading=14
         ))
         self.styles.add(ParagraphStyle(
             name='QuestionBold',
-            fontName='Arial-Bold',
+            fontName='DejaVuSans-Bold',
             fontSize=12,
             leading=14
         ))
         self.styles.add(ParagraphStyle(
             name='Choice',
-            fontName='Arial',
+            fontName='DejaVuSans',
             fontSize=11,
             leading=13,
             leftIndent=20
         ))
         self.styles.add(ParagraphStyle(
             name='Answer',
-            fontName='Arial-Bold',
+            fontName='DejaVuSans-Bold',
             fontSize=11,
             leading=13,
             leftIndent=20
         ))
     
-    def _create_question_block(self, question: Dict, style: ParagraphStyle, highlight_correct: bool = False) -> List:
+    def _create_question_block(self, idx: int, question: Dict, style: ParagraphStyle,
+                               answer_key: Dict[int, str], highlight_correct: bool = False) -> List:
         """Create a question block with its choices.
         
         Args:
+            idx: Question number (1-based)
             question: Question dictionary
             style: Style for the question text
+            answer_key: Question number -> correct letter, for (letter, text) choices
             highlight_correct: If True, in đậm chữ cái đầu đáp án đúng
         Returns:
             List: List of Paragraph objects
@@ -68,11 +126,9 @@ class PDFWriter:
         elements.append(Spacer(1, 0.1 * inch))
         
         # Add choices
-        for choice in question['choices']:
-            letter = choice.get('letter', '?')
-            text = choice.get('text', '')
-            if highlight_correct and choice.get('is_correct', False):
-                elements.append(Paragraph(f"<b>{letter}</b>. {text}", self.styles['Choice']))
+        for letter, text, is_correct in iter_choices(idx, question, answer_key, highlight_correct):
+            if is_correct:
+                elements.append(Paragraph(f"<b><font name='DejaVuSans-Bold'>{letter}</font></b>. {text}", self.styles['Choice']))
             else:
                 elements.append(Paragraph(f"{letter}. {text}", self.styles['Choice']))
             elements.append(Spacer(1, 0.05 * inch))
@@ -80,22 +136,20 @@ class PDFWriter:
         elements.append(Spacer(1, 0.2 * inch))
         return elements
     
-    def write_original(self, questions: List[Dict], output_path: str):
-        """Write the original questions without answer markers.
-        
-        Args:
-            questions: List of question dictionaries
-            output_path: Path to save the output PDF
-        """
+    def write_exam(self, questions: List[Dict], output_path: str, show_answer: bool = False,
+                   answer_key: Optional[Dict[int, str]] = None) -> None:
         c = canvas.Canvas(output_path, pagesize=letter)
         width, height = letter
         
+        style = self.styles['QuestionBold' if show_answer else 'Question']
         elements = []
-        for question in questions:
+        for idx, question in enumerate(questions, 1):
             elements.extend(self._create_question_block(
-                question, 
-                self.styles['Question'],
-                highlight_correct=False
+                idx,
+                question,
+                style,
+                answer_key or {},
+                highlight_correct=show_answer
             ))
         
         # Create PDF
@@ -113,37 +167,194 @@ class PDFWriter:
                 height -= element.height
         
         c.save()
-    
-    def write_answer_key(self, questions: List[Dict], output_path: str):
-        """Write the answer key with correct answers.
-        
+
+class ReportLabWriter(ExamWriter):
+    """ReportLab platypus layout (the layout of auto_exam_pdf.make_pdf)."""
+
+    def __init__(self):
+        register_dejavu()
+        self.question_style = QUESTION_STYLE
+        self.choice_style = CHOICE_STYLE
+
+    def write_exam(self, questions: List[Dict], output_path: str, show_answer: bool = False,
+                   answer_key: Optional[Dict[int, str]] = None) -> None:
+        answer_key = answer_key or {}
+        doc = SimpleDocTemplate(output_path, pagesize=PAGE_SIZE, rightMargin=MARGIN_RIGHT, leftMargin=MARGIN_LEFT,
+                                topMargin=MARGIN_TOP, bottomMargin=MARGIN_BOTTOM)
+        story = []
+        for idx, q in enumerate(questions, 1):
+            story.append(Paragraph(f"<b>Câu {idx}:</b> {q['question']}", self.question_style))
+            for choice_letter, text_choice, is_correct in iter_choices(idx, q, answer_key, show_answer):
+                if is_correct:
+                    story.append(Paragraph(f"<b><font name='DejaVuSans-Bold'>{choice_letter}</font></b>. {text_choice}", self.choice_style))
+                else:
+                    story.append(Paragraph(f"{choice_letter}. {text_choice}", self.choice_style))
+            story.append(Spacer(1, QUESTION_GAP))
+        doc.build(story)
+
+class StoryWriter(ExamWriter):
+    """PyMuPDF Story backend: the exam as HTML, laid out by MuPDF's box model.
+
+    Same page size, margins, font sizes and spacing as ReportLabWriter.
+    MuPDF embeds the whole DejaVu fonts, so they are subset before saving.
+    """
+
+    CSS = """
+    @font-face {font-family: dejavu; src: url(%s);}
+    @font-face {font-family: dejavu; src: url(%s); font-weight: bold;}
+    body {font-family: dejavu; margin: 0;}
+    p {margin: 0;}
+    p.question {font-size: %gpt; line-height: %gpt;}
+    p.choice {font-size: %gpt; line-height: %gpt; margin-left: %gpt;}
+    div.block {margin-bottom: %gpt;}
+    """ % (DEJAVU_REGULAR.name, DEJAVU_BOLD.name, QUESTION_STYLE.fontSize, QUESTION_STYLE.leading,
+           CHOICE_STYLE.fontSize, CHOICE_STYLE.leading, CHOICE_STYLE.leftIndent, QUESTION_GAP)
+
+    def __init__(self, subset_fonts: bool = True):
+        """Initialize the writer.
+
         Args:
-            questions: List of question dictionaries
-            output_path: Path to save the output PDF
+            subset_fonts: Keep only the glyphs used (a full DejaVu pair is ~1.4 MB per file)
         """
-        c = canvas.Canvas(output_path, pagesize=letter)
-        width, height = letter
-        
-        elements = []
-        for question in questions:
-            elements.extend(self._create_question_block(
-                question,
-                self.styles['QuestionBold'],
-                highlight_correct=True
-            ))
-        
-        # Create PDF
-        for element in elements:
-            if isinstance(element, Paragraph):
-                element.wrapOn(c, width - 2*inch, height)
-                element.drawOn(c, inch, height - inch)
-                height -= element.height + 0.1*inch
-                
-                # Start new page if needed
-                if height < 2*inch:
-                    c.showPage()
-                    height = letter[1] - inch
-            else:  # Spacer
-                height -= element.height
-        
-        c.save() 
\ No newline at end of file
+        self.subset_fonts = subset_fonts
+        self.archive = fitz.Archive(str(FONT_DIR))
+
+    def to_html(self, questions: List[Dict], show_answer: bool = False,
+                answer_key: Optional[Dict[int, str]] = None) -> str:
+        """Build the HTML body of the exam."""
+        answer_key = answer_key or {}
+        parts = ["<body>"]
+        for idx, q in enumerate(questions, 1):
+            parts.append(f'<div class="block"><p class="question"><b>Câu {idx}:</b> {html.escape(q["question"])}</p>')
+            for choice_letter, text_choice, is_correct in iter_choices(idx, q, answer_key, show_answer):
+                label = f"<b>{choice_letter}</b>" if is_correct else choice_letter
+                parts.append(f'<p class="choice">{label}. {html.escape(text_choice or "")}</p>')
+            parts.append("</div>")
+        parts.append("</body>")
+        return "".join(parts)
+
+    def write_exam(self, questions: List[Dict], output_path: str, show_answer: bool = False,
+                   answer_key: Optional[Dict[int, str]] = None) -> None:
+        story = fitz.Story(self.to_html(questions, show_answer, answer_key), user_css=self.CSS, archive=self.archive)
+        mediabox = fitz.Rect(0, 0, *PAGE_SIZE)
+        # SimpleDocTemplate margins plus its frame padding, as in ReportLabWriter
+        where = mediabox + (MARGIN_LEFT + FRAME_PADDING, MARGIN_TOP + FRAME_PADDING,
+                            -MARGIN_RIGHT - FRAME_PADDING, -MARGIN_BOTTOM - FRAME_PADDING)
+        buffer = io.BytesIO()
+        writer = fitz.DocumentWriter(buffer)
+        more = 1
+        while more:
+            device = writer.begin_page(mediabox)
+            more, _ = story.place(where)
+            story.draw(device)
+            writer.end_page()
+        writer.close()
+        doc = fitz.open(stream=buffer.getvalue(), filetype="pdf")
+        try:
+            if self.subset_fonts:
+                doc.subset_fonts()
+            doc.save(output_path, garbage=3, deflate=True, use_objstms=1)
+        finally:
+            doc.close()
+
+class IncrementalExamWriter:
+    """Writes the exam and answer PDFs one question at a time.
+
+    Uses the page geometry and styles of auto_exam_pdf.make_pdf, but draws
+    each question as soon as it is added instead of building the whole story
+    first, so questions can be written while later ones are still parsed.
+    """
+
+    def __init__(self, original_path: str, answer_path: Optional[str],
+                 answer_key: Optional[Dict[int, str]] = None):
+        """Open the output files.
+
+        Args:
+            original_path: Path of the exam without answers
+            answer_path: Path of the exam with the correct letters in bold (None to skip it)
+            answer_key: Question number (1-based) -> correct letter, for tuple choices
+        """
+        register_dejavu()
+        self.page_width, self.page_height = PAGE_SIZE
+        # SimpleDocTemplate margins plus its frame padding
+        self.x = MARGIN_LEFT + FRAME_PADDING
+        self.width = self.page_width - MARGIN_LEFT - MARGIN_RIGHT - 2 * FRAME_PADDING
+        self.top = self.page_height - MARGIN_TOP - FRAME_PADDING
+        self.bottom = MARGIN_BOTTOM + FRAME_PADDING
+        self.question_style = QUESTION_STYLE
+        self.choice_style = CHOICE_STYLE
+        self.answer_key = answer_key or {}
+        paths = [original_path] + ([answer_path] if answer_path else [])
+        self.canvases = [canvas.Canvas(path, pagesize=PAGE_SIZE) for path in paths]
+        self.cursors = [self.top] * len(paths)
+        self.count = 0
+
+    def add(self, question: Dict) -> None:
+        """Append one question (choices as dicts with is_correct, or (letter, text) tuples judged by answer_key)."""
+        self.count += 1
+        title = f"<b>Câu {self.count}:</b> {question['question']}"
+        original = [Paragraph(title, self.question_style)]
+        answer = [Paragraph(title, self.question_style)]
+        for choice_letter, text_choice, is_correct in iter_choices(self.count, question, self.answer_key, True):
+            original.append(Paragraph(f"{choice_letter}. {text_choice}", self.choice_style))
+            if is_correct:
+                answer.append(Paragraph(f"<b><font name='DejaVuSans-Bold'>{choice_letter}</font></b>. {text_choice}", self.choice_style))
+            else:
+                answer.append(Paragraph(f"{choice_letter}. {text_choice}", self.choice_style))
+        for idx, paragraphs in enumerate((original, answer)[:len(self.canvases)]):
+            for paragraph in paragraphs:
+                self._draw(idx, paragraph)
+            self.cursors[idx] -= QUESTION_GAP  # Spacer after each question
+
+    def _draw(self, idx: int, paragraph: Paragraph) -> None:
+        c = self.canvases[idx]
+        while paragraph is not None:
+            available = self.cursors[idx] - self.bottom
+            _, height = paragraph.wrap(self.width, available)
+            if height <= available:
+                paragraph.drawOn(c, self.x, self.cursors[idx] - height)
+                self.cursors[idx] -= height
+                return
+            parts = paragraph.split(self.width, available)
+            if len(parts) == 2:
+                _, height = parts[0].wrap(self.width, available)
+                parts[0].drawOn(c, self.x, self.cursors[idx] - height)
+                paragraph = parts[1]
+            elif self.cursors[idx] >= self.top:
+                # Taller than a page and cannot be split: draw it anyway
+                paragraph.drawOn(c, self.x, self.cursors[idx] - height)
+                paragraph = None
+            c.showPage()
+            self.cursors[idx] = self.top
+
+    def close(self) -> None:
+        """Finish the last page and save both files."""
+        for c in self.canvases:
+            c.showPage()
+            c.save()
+
+    def discard(self) -> None:
+        """Drop both files without writing them (existing outputs are left untouched)."""
+        self.canvases = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+WRITERS = {
+    'reportlab': ReportLabWriter,
+    'story': StoryWriter,
+    'canvas': PDFWriter,
+}
+
+def get_writer(name: str) -> ExamWriter:
+    """Return an instance of the backend registered under name ('reportlab', 'story' or 'canvas')."""
+    try:
+        return WRITERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown writer backend: {name} (choose from {', '.join(WRITERS)})") from None
@@ -0,0 +1,30 @@
+"""Fixtures shared by the PDF tests."""
+import fitz
+import pytest
+
+from pdf_tools.fonts import DEJAVU_REGULAR
+
+@pytest.fixture
+def exam_pdf(tmp_path):
+    """Return a function writing pages of text lines to a PDF in tmp_path.
+
+    Each page is a list of lines: plain strings are set 18pt apart from
+    (72, 72), (x, y, text) tuples at that position. highlight=(page, line)
+    draws a yellow fill behind that line, as scanners and editors bake it.
+    """
+    def write(pages, name="exam.pdf", highlight=None):
+        path = tmp_path / name
+        doc = fitz.open()
+        for page_no, lines in enumerate(pages):
+            page = doc.new_page()
+            y = 72
+            for line_no, line in enumerate(lines):
+                x, y, text = line if isinstance(line, tuple) else (72, y, line)
+                if highlight == (page_no, line_no):
+                    page.draw_rect(fitz.Rect(x - 2, y - 11, x + 88, y + 3), color=None, fill=(1, 1, 0))
+                page.insert_text((x, y), text, fontsize=11, fontname="dejavu", fontfile=str(DEJAVU_REGULAR))
+                y += 18
+        doc.save(str(path))
+        doc.close()
+        return path
+    return write
@@ -0,0 +1,44 @@
+"""Exam generators shared by the tests, benchmarks and load tests.
+
+Kept free of imports with side effects (auto_exam_pdf exits at import time
+when the fonts are missing) so any test can use them.
+"""
+import random
+
+from pdf_tools.tokenizer import parse_questions_and_answers
+
+def generate_bank(n_questions: int, seed: int = 0, mixed: bool = True) -> str:
+    """Generate an exam text with n questions and an answer table at the end.
+
+    With mixed=False every question uses "Câu n:" numbering, the only style
+    the legacy parser understands.
+    """
+    rng = random.Random(seed)
+    words = ["nhiễm", "khuẩn", "bệnh", "viện", "điều", "dưỡng", "phòng", "ngừa",
+             "vệ", "sinh", "tay", "dụng", "cụ", "tiệt", "trùng", "kháng", "sinh"]
+    lines = []
+    key = []
+    for num in range(1, n_questions + 1):
+        style = num % 3 if mixed else 0
+        prefix = f"Câu {num}:" if style == 0 else f"{num}." if style == 1 else f"{num})"
+        lines.append(f"{prefix} {' '.join(rng.choices(words, k=12))}?")
+        for letter in "ABCD":
+            lines.append(f"{letter}. {' '.join(rng.choices(words, k=6))}")
+            if rng.random() < 0.1:
+                lines.append(' '.join(rng.choices(words, k=5)))
+        key.append(f"{num}-{rng.choice('ABCD')}")
+    lines.append("ĐÁP ÁN")
+    lines.extend(key)
+    return "\n".join(lines) + "\n"
+
+def build_questions(n_questions: int):
+    """Parsed questions in the LLM output format, with the correct choice flagged."""
+    questions, answer_key = parse_questions_and_answers(generate_bank(n_questions))
+    result = []
+    for idx, q in enumerate(questions, 1):
+        result.append({
+            'question': q['question'],
+            'choices': [{'letter': letter, 'text': text, 'is_correct': letter == answer_key.get(idx)}
+                        for letter, text in q['choices']]
+        })
+    return result
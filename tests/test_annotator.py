@@ -0,0 +1,76 @@
+"""Tests for in-place answer highlighting."""
+import pytest
+import fitz
+from pdf_tools.annotator import align_questions, highlight_answers, locate_questions
+from pdf_tools.parser import PDFParser
+
+EXAM = ["1. Thủ đô của Việt Nam?", "A. Huế", "B. Hà Nội", "2. Một cộng một?", "A. 2", "B. 3"]
+
+QUESTIONS = [
+    {'question': "Thủ đô của Việt Nam?", 'choices': [
+        {'letter': 'A', 'text': 'Huế', 'is_correct': False},
+        {'letter': 'B', 'text': 'Hà Nội', 'is_correct': True}]},
+    {'question': "Một cộng một?", 'choices': [
+        {'letter': 'A', 'text': '2', 'is_correct': True},
+        {'letter': 'B', 'text': '3', 'is_correct': False}]},
+]
+
+def _marked_texts(path):
+    """Text under each highlighted quad, in order."""
+    doc = fitz.open(str(path))
+    marked = []
+    for page in doc:
+        for annot in page.annots():
+            vertices = annot.vertices
+            quads = [fitz.Quad(vertices[i:i + 4]) for i in range(0, len(vertices), 4)]
+            marked += [page.get_textbox(quad.rect).strip() for quad in quads]
+    doc.close()
+    return marked
+
+def test_highlight_marks_correct_choices(exam_pdf, tmp_path):
+    """Test that the correct choice lines get highlight annotations."""
+    source = exam_pdf([EXAM])
+    output = tmp_path / "answer.pdf"
+
+    assert highlight_answers(str(source), QUESTIONS, str(output)) == 2
+
+    doc = fitz.open(str(output))
+    assert len(list(doc[0].annots())) == 1  # one highlight annotation per page
+    doc.close()
+    assert _marked_texts(output) == ["B. Hà Nội", "A. 2"]
+
+def test_search_fallback_when_layout_differs(exam_pdf, tmp_path):
+    """Test that answers are found by text below their question when question counts differ."""
+    source = exam_pdf([EXAM])
+    extra = QUESTIONS + [{'question': "Không có trên trang", 'choices': [], 'answer': None}]
+    output = tmp_path / "out.pdf"
+    assert highlight_answers(str(source), extra, str(output)) == 2
+    # "A. 2" must not land on the question number "2."
+    assert _marked_texts(output) == ["B. Hà Nội", "A. 2"]
+    assert highlight_answers(str(source), extra, str(tmp_path / "bold.pdf"), style="bold") == 2
+
+def test_alignment_marks_around_an_unmatched_question(exam_pdf, tmp_path):
+    """Test that an extra parsed question does not break position matching of the others."""
+    source = exam_pdf([EXAM])
+    extra = [QUESTIONS[0], {'question': "Không có trên trang", 'choices': [], 'answer': 'A'}, QUESTIONS[1]]
+    parser = PDFParser(str(source), detect_raster_highlights=False)
+    located = locate_questions(parser.extract_spans())
+    parser.close()
+    assert align_questions(located, extra) == [0, None, 1]
+    output = tmp_path / "out.pdf"
+    assert highlight_answers(str(source), extra, str(output)) == 2
+    assert _marked_texts(output) == ["B. Hà Nội", "A. 2"]
+
+def test_bold_overlay_starts_at_the_letter(exam_pdf, tmp_path):
+    """Test that the bold letter is drawn on the label when its span starts with spaces."""
+    source = exam_pdf([["1. Thủ đô?", "    A. Huế", "    B. Hà Nội"]])
+    doc = fitz.open(str(source))
+    label_x = next(w[0] for w in doc[0].get_text("words") if w[4] == "B.")
+    doc.close()
+    output = tmp_path / "bold.pdf"
+    assert highlight_answers(str(source), QUESTIONS[:1], str(output), style="bold") == 1
+    doc = fitz.open(str(output))
+    spans = [span for block in doc[0].get_text("dict")['blocks'] for line in block['lines']
+             for span in line['spans'] if span['text'] == "B."]
+    doc.close()
+    assert len(spans) == 1 and spans[0]['origin'][0] == pytest.approx(label_x, abs=0.5)
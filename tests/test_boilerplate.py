@@ -0,0 +1,44 @@
+"""Tests for header/footer stripping."""
+import fitz
+from pdf_tools.boilerplate import BoilerplateReport, extract_pages_without_boilerplate, iter_pages_without_boilerplate
+
+def _exam_pages(n_pages=4):
+    """Three questions per page under a school header, with a "Trang n" footer."""
+    pages = []
+    number = 1
+    for page_no in range(n_pages):
+        lines = [(72, 40, "Trường THPT Nguyễn Du - Đề kiểm tra")]
+        y = 90 + page_no * 7  # questions do not line up between pages
+        for _ in range(3):
+            lines += [(72, y, f"Câu {number}: Câu hỏi số {number}?"), (90, y + 16, "A. Đúng"), (90, y + 32, "B. Sai")]
+            y += 60
+            number += 1
+        lines.append((280 + (page_no > 1) * 4, 810, f"Trang {page_no + 1}"))
+        pages.append(lines)
+    return pages
+
+def test_repeated_lines_are_removed(exam_pdf):
+    """Test that the header and page numbers go while questions and choices stay."""
+    source = exam_pdf(_exam_pages())
+    pages, report = extract_pages_without_boilerplate(str(source))
+    text = "".join(page.text for page in pages)
+    assert "Trường THPT" not in text and "Trang" not in text
+    assert text.count("A. Đúng") == 12 and "Câu 12: Câu hỏi số 12?" in text
+    assert report.lines_removed == 8
+    assert report.tokens_saved > 0 and "tokens saved" in report.format()
+
+def test_streamed_pages_match(exam_pdf):
+    """Test that streaming with a short sample strips the same lines as the whole-document pass."""
+    source = exam_pdf(_exam_pages(n_pages=6))
+    pages, report = extract_pages_without_boilerplate(str(source))
+    streamed_report = BoilerplateReport()
+    streamed = list(iter_pages_without_boilerplate(str(source), streamed_report, sample_pages=3))
+    assert streamed == pages
+    assert streamed_report.format() == report.format()
+
+def test_single_page_is_untouched(exam_pdf):
+    """Test that nothing is stripped when there is no other page to compare with."""
+    source = exam_pdf(_exam_pages(n_pages=1))
+    pages, report = extract_pages_without_boilerplate(str(source))
+    assert report.lines_removed == 0
+    assert pages[0].text == fitz.open(str(source))[0].get_text()
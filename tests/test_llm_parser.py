@@ -0,0 +1,41 @@
+"""Tests for the LLM parser helpers (no network)."""
+import pytest
+from llm_parser import (
+    split_chunk_into_blocks, format_compact_blocks, rebuild_from_compact, split_text_into_chunks
+)
+
+CHUNK = ("Đề thi học kỳ\n"
+         "Câu 1: Thủ đô của Việt Nam\nlà gì?\nA. Hà Nội\nB. Huế\n"
+         "Câu 2: Một cộng một?\nA. 2\nB. 3\nnhưng viết ở hệ cơ số 4\n")
+
+def test_compact_blocks_are_numbered():
+    """Test the numbered block/line layout sent in compact mode."""
+    blocks = split_chunk_into_blocks(CHUNK)
+    assert len(blocks) == 3
+    text = format_compact_blocks(blocks)
+    assert text.splitlines()[:4] == ["[1]", "0|Đề thi học kỳ", "[2]", "0|Câu 1: Thủ đô của Việt Nam"]
+
+def test_rebuild_from_compact():
+    """Test rebuilding questions from block ids, choice offsets and answer letters."""
+    blocks = split_chunk_into_blocks(CHUNK)
+    items = [{"b": 2, "c": [2, 3], "a": "A"}, {"b": 3, "c": [1, 2], "a": "B"}]
+    questions = rebuild_from_compact(blocks, items)
+    assert [q['question'] for q in questions] == ["Thủ đô của Việt Nam là gì?", "Một cộng một?"]
+    assert questions[0]['choices'] == [
+        {'letter': 'A', 'text': 'Hà Nội', 'is_correct': True},
+        {'letter': 'B', 'text': 'Huế', 'is_correct': False}]
+    assert questions[1]['choices'][1] == {'letter': 'B', 'text': '3 nhưng viết ở hệ cơ số 4', 'is_correct': True}
+
+def test_rebuild_ignores_invalid_items():
+    """Test that out-of-range or malformed items are skipped."""
+    blocks = split_chunk_into_blocks(CHUNK)
+    assert rebuild_from_compact(blocks, [{"b": 9, "c": [1]}, {"c": [1]}, {"b": "x"}]) == []
+    # a malformed item after a valid one must not discard the whole chunk
+    questions = rebuild_from_compact(blocks, [{"b": 2, "c": [2, 3], "a": "A"}, {"b": 2, "q": "x"}, "3"])
+    assert [q['question'] for q in questions] == ["Thủ đô của Việt Nam là gì?"]
+
+def test_split_text_into_chunks_keeps_questions_whole():
+    """Test that chunks are cut at question markers."""
+    chunks = split_text_into_chunks(CHUNK * 3, max_chunk_size=120)
+    assert "".join(chunks) == CHUNK * 3
+    assert all(chunk.lstrip("\n").startswith(("Câu", "Đề")) for chunk in chunks)
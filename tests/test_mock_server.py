@@ -0,0 +1,124 @@
+"""Tests for the local DeepSeek stand-in used by the load tests."""
+import json
+import threading
+import time
+import pytest
+import requests
+import llm_parser
+from loadtest.mock_server import LatencyModel, MockConfig, MockDeepSeekServer
+
+EXAM = "Câu 1: Thủ đô của Việt Nam?\nA. Hà Nội\nB. Huế\nCâu 2: Một cộng một?\nA. 2\nB. 3\n"
+
+@pytest.fixture
+def use_server(monkeypatch):
+    def start(**config):
+        server = MockDeepSeekServer(MockConfig(seed=1, **config)).start()
+        monkeypatch.setattr(llm_parser, "DEEPSEEK_API_URL", server.chat_url)
+        monkeypatch.setattr(llm_parser, "DEEPSEEK_API_KEY", "mock-key")
+        servers.append(server)
+        return server
+    servers = []
+    yield start
+    for server in servers:
+        server.stop()
+
+def test_parser_round_trip(use_server):
+    """Test that parse_questions_with_llm works unchanged against the mock."""
+    use_server()
+    questions = llm_parser.parse_questions_with_llm(EXAM)
+    assert [q['question'] for q in questions] == ["Thủ đô của Việt Nam?", "Một cộng một?"]
+    assert [c['letter'] for c in questions[0]['choices']] == ['A', 'B']
+
+def test_compact_round_trip(use_server):
+    """Test that compact replies keep every question, including two sharing a block."""
+    use_server()
+    # "Câu 3 :" is not a chunk marker, so questions 2 and 3 share a block
+    text = EXAM + "Câu 3 : Hai cộng hai?\nA. 4\nB. 5\n"
+    assert (llm_parser.parse_questions_with_llm(text, compact=True)
+            == llm_parser.parse_questions_with_llm(text))
+
+def test_streaming_response(use_server):
+    """Test the server-sent events shape of streamed replies."""
+    server = use_server()
+    response = requests.post(server.chat_url, json={
+        'model': 'deepseek-chat', 'stream': True,
+        'messages': [{'role': 'user', 'content': 'Which choice is correct?'}]}, stream=True)
+    events = [line[len(b"data: "):] for line in response.iter_lines() if line.startswith(b"data: ")]
+    assert events[-1] == b"[DONE]"
+    content = "".join(json.loads(e)['choices'][0]['delta'].get('content', '') for e in events[:-1])
+    assert content == "A"
+
+def test_error_injection(use_server):
+    """Test that injected 429s surface as parser errors."""
+    server = use_server(rate_429=1.0)
+    with pytest.raises(RuntimeError, match="429"):
+        llm_parser.parse_questions_with_llm(EXAM)
+    assert [s['status'] for s in server.stats] == [429]
+
+def test_latency_models():
+    """Test the latency distribution parser."""
+    import random
+    rng = random.Random(0)
+    assert LatencyModel.parse("constant:0.5").sample(rng) == 0.5
+    assert 0.1 <= LatencyModel.parse("uniform:0.1,0.2").sample(rng) <= 0.2
+    assert LatencyModel.parse("pareto:0.1,1.5").sample(rng) >= 0.1
+    with pytest.raises(ValueError):
+        LatencyModel.parse("bogus:1")
+
+def test_percentile_nearest_rank():
+    """Test nearest-rank percentiles (no round-half-to-even off-by-one)."""
+    from loadtest.driver import percentile
+    values = list(range(1, 101))
+    assert [percentile(values, pct) for pct in (50, 90, 95, 99, 100)] == [50, 90, 95, 99, 100]
+    assert percentile([3.0], 90) == 3.0 and percentile([], 90) == 0.0
+
+def test_hedging_respects_budget(use_server, monkeypatch):
+    """Test that slow chunks are hedged up to the extra-request budget."""
+    from tests.helpers import generate_bank
+    server = use_server(latency=LatencyModel.parse("constant:0.2"))
+    tracker = llm_parser.LatencyTracker(window=1000)
+    for _ in range(100):  # keep p90 below the server latency for the whole run
+        tracker.add(0.01)
+    monkeypatch.setattr(llm_parser, "_LATENCY", tracker)
+    text = generate_bank(60, seed=0)
+    chunks = len(llm_parser.split_text_into_chunks(text))
+    report = llm_parser.RunReport()
+    questions = llm_parser.parse_questions_with_llm(text, hedge=True, hedge_budget=0.5, report=report)
+    assert len(questions) == 60
+    assert report.chunks == chunks
+    assert report.hedged == chunks // 2
+    assert report.hedges_skipped == chunks - report.hedged
+    assert report.requests == chunks + report.hedged
+    assert len(server.stats) >= chunks
+    # Cancelled losers still count towards p90, censored at the cancel point
+    deadline = time.perf_counter() + 2.0
+    while len(tracker.samples) < 100 + report.requests and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert len(tracker.samples) == 100 + report.requests
+
+def test_cancelled_request_is_aborted(use_server):
+    """Test that a cancelled hedged request hangs up instead of waiting for the reply."""
+    server = use_server(latency=LatencyModel.parse("constant:5"))
+    cancelled = threading.Event()
+    data, _ = llm_parser._build_request(EXAM, "deepseek-chat", compact=False)
+    threading.Timer(0.2, cancelled.set).start()
+    started = time.perf_counter()
+    assert llm_parser._post(data, cancelled) is None
+    assert time.perf_counter() - started < 1.0
+    deadline = time.perf_counter() + 1.0
+    while not server.stats and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert [s['status'] for s in server.stats] == [499]
+
+def test_hedging_heavy_tail(use_server, monkeypatch):
+    """Test hedged parsing against a heavy-tailed latency distribution."""
+    from tests.helpers import generate_bank
+    use_server(latency=LatencyModel.parse("pareto:0.01,1.1"))
+    monkeypatch.setattr(llm_parser, "_LATENCY", llm_parser.LatencyTracker())
+    text = generate_bank(120, seed=1)
+    report = llm_parser.RunReport()
+    hedged = llm_parser.parse_questions_with_llm(text, hedge=True, hedge_budget=0.2, max_workers=4, report=report)
+    assert hedged == llm_parser.parse_questions_with_llm(text)
+    assert report.hedged <= max(1, int(report.chunks * 0.2))
+    assert report.hedge_wins <= report.hedged
+    assert "hedging" in report.format()
@@ -0,0 +1,35 @@
+"""Tests for output PDF optimization."""
+import fitz
+from tests.helpers import build_questions
+from pdf_tools.optimize import optimize_pdf
+from pdf_tools.writer import IncrementalExamWriter
+
+def _texts(path):
+    doc = fitz.open(str(path))
+    texts = [page.get_text() for page in doc]
+    doc.close()
+    return texts
+
+def test_optimize_shrinks_and_keeps_text(tmp_path):
+    """Test that the optimized copy is smaller and reads the same."""
+    source = tmp_path / "exam.pdf"
+    with IncrementalExamWriter(str(source), None) as writer:
+        for question in build_questions(60):
+            writer.add(question)
+    output = tmp_path / "exam.min.pdf"
+    result = optimize_pdf(str(source), str(output), linear=True)
+    assert result.size_after < result.size_before == source.stat().st_size
+    assert result.fonts_subset
+    assert _texts(output) == _texts(source)
+    assert "KB" in result.format()
+
+def test_optimize_in_place(tmp_path):
+    """Test that the source file is overwritten when no output path is given."""
+    source = tmp_path / "exam.pdf"
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "1. Hello")
+    doc.save(str(source))
+    doc.close()
+    result = optimize_pdf(str(source))
+    assert result.path == str(source) and source.stat().st_size == result.size_after
+    assert "1. Hello" in _texts(source)[0]
@@ -0,0 +1,84 @@
+"""Tests for page-level incremental re-parsing."""
+import pytest
+from pdf_tools.pages import (
+    PageText, text_digest, split_into_blocks, parse_pages_incremental, questions_by_page
+)
+
+def _pages(*texts):
+    return [PageText(number=i, text=t, digest=text_digest(t)) for i, t in enumerate(texts)]
+
+def _fake_parse(calls):
+    def parse(text):
+        calls.append(text)
+        questions = []
+        for block in text.split("\nCâu ")[1:]:
+            lines = block.strip().split("\n")
+            questions.append({'question': lines[0].split(":", 1)[1].strip(), 'choices': []})
+        return questions
+    return parse
+
+PAGE_1 = "Đề thi\nCâu 1: Một cộng một?\nA. 2\nB. 3\n"
+PAGE_2 = "Câu 2: Thủ đô?\nA. Hà Nội\nB. Huế\nCâu 3: Màu trời?\nA. Xanh\nB. Đỏ\n"
+
+def test_blocks_track_pages():
+    """Test that question blocks know which pages they cover."""
+    blocks = split_into_blocks(_pages(PAGE_1, PAGE_2))
+    assert len(blocks) == 4  # preamble + 3 questions
+    assert [(b.first_page, b.last_page) for b in blocks] == [(0, 0), (0, 0), (1, 1), (1, 1)]
+
+def test_unchanged_document_is_not_reparsed():
+    """Test that a second run over the same pages makes no parse calls."""
+    calls = []
+    pages = _pages(PAGE_1, PAGE_2)
+    questions, manifest, reparsed = parse_pages_incremental(pages, _fake_parse(calls))
+    assert len(questions) == 3
+    assert reparsed == 4
+
+    calls.clear()
+    again, _, reparsed = parse_pages_incremental(pages, _fake_parse(calls), manifest, questions)
+    assert calls == []
+    assert reparsed == 0
+    assert again == questions
+
+def test_only_changed_page_is_reparsed():
+    """Test that a revised page only re-parses the questions on it."""
+    calls = []
+    questions, manifest, _ = parse_pages_incremental(_pages(PAGE_1, PAGE_2), _fake_parse(calls))
+    assert questions_by_page(manifest) == {0: [0], 1: [1, 2]}
+
+    calls.clear()
+    revised = _pages(PAGE_1, PAGE_2.replace("Màu trời?", "Màu lá?"))
+    updated, _, reparsed = parse_pages_incremental(revised, _fake_parse(calls), manifest, questions)
+    assert reparsed == 2
+    assert len(calls) == 1 and "Câu 1:" not in calls[0]
+    assert [q['question'] for q in updated] == ["Một cộng một?", "Thủ đô?", "Màu lá?"]
+
+def test_unattributed_questions_are_not_reused():
+    """Test that a run whose questions cannot be matched to blocks is re-parsed whole."""
+    def rephrasing_parse(text):
+        return [dict(q, question="Hỏi: " + q['question']) if "Thủ đô" in q['question'] else q
+                for q in _fake_parse([])(text)]
+    questions, manifest, _ = parse_pages_incremental(_pages(PAGE_1, PAGE_2), rephrasing_parse)
+    assert all(entry.get('reusable') is False for entry in manifest['blocks'])
+    assert questions_by_page(manifest) == {0: [0, 1, 2], 1: [0, 1, 2]}
+
+    revised = _pages(PAGE_1, PAGE_2.replace("Màu trời?", "Màu lá?"))
+    updated, _, reparsed = parse_pages_incremental(revised, rephrasing_parse, manifest, questions)
+    assert reparsed == 4
+    assert [q['question'] for q in updated] == ["Một cộng một?", "Hỏi: Thủ đô?", "Màu lá?"]
+
+def test_shared_prefix_across_page_break():
+    """Test that questions with the same opening get one block each, also across a page break."""
+    page_1 = "Đề\nCâu 1: Chọn phát biểu đúng về khử khuẩn bằng cồn\nA. x\nB. y\nCâu 2: Chọn phát biểu đúng về khử khuẩn bằng nhiệt\nA. "
+    page_2 = "x\nB. z\nCâu 3: Chọn phát biểu đúng về khử khuẩn bằng hóa chất\nA. x\nB. y\n"
+    questions, manifest, _ = parse_pages_incremental(_pages(page_1, page_2), _fake_parse([]))
+    assert [entry['questions'] for entry in manifest['blocks']] == [[0, 0], [0, 1], [1, 2], [2, 3]]
+    assert questions_by_page(manifest) == {0: [0, 1], 1: [1, 2]}
+
+    revised = _pages(page_1, page_2.replace("hóa chất", "tia cực tím"))
+    updated, _, reparsed = parse_pages_incremental(revised, _fake_parse([]), manifest, questions)
+    assert reparsed == 2
+    assert [q['question'] for q in updated] == [
+        "Chọn phát biểu đúng về khử khuẩn bằng cồn",
+        "Chọn phát biểu đúng về khử khuẩn bằng nhiệt",
+        "Chọn phát biểu đúng về khử khuẩn bằng tia cực tím"]
@@ -0,0 +1,62 @@
+"""Tests for the pipelined extract -> LLM -> write mode."""
+import random
+import threading
+import time
+import fitz
+import pytest
+from tests.helpers import generate_bank
+from llm_parser import split_text_into_chunks
+from pdf_tools.pages import PageText
+from pdf_tools.pipeline import chunk_pages, run_pipeline
+from pdf_tools.tokenizer import parse_questions_and_answers
+
+def _pages(text, size=700):
+    return [PageText(i, text[start:start + size], '') for i, start in enumerate(range(0, len(text), size))]
+
+def _slow_parse(chunk):
+    time.sleep(random.uniform(0, 0.01))
+    questions, _ = parse_questions_and_answers(chunk)
+    return [{'question': q['question'], 'choices': [{'letter': l, 'text': t} for l, t in q['choices']]}
+            for q in questions]
+
+def test_chunk_pages_matches_whole_text_chunking():
+    """Test that streaming chunking gives the same chunks as chunking the whole text."""
+    text = generate_bank(120, seed=3)
+    assert list(chunk_pages(_pages(text))) == split_text_into_chunks(text)
+
+def test_pipeline_keeps_document_order(tmp_path):
+    """Test that questions are written in order although chunks finish out of order."""
+    text = generate_bank(80, seed=4, mixed=False)
+    expected = _slow_parse(text)
+    questions, stats = run_pipeline("unused.pdf", _slow_parse, str(tmp_path / "original.pdf"),
+                                    str(tmp_path / "answer.pdf"), workers=4, max_chunk_size=500,
+                                    queue_size=2, pages=_pages(text))
+    assert questions == expected
+    assert stats.questions == 80 and stats.chunks > 4
+    doc = fitz.open(str(tmp_path / "original.pdf"))
+    assert f"Câu 80: {expected[-1]['question'][:20]}" in "".join(page.get_text() for page in doc).replace("\n", " ")
+    doc.close()
+
+def test_pipeline_propagates_errors(tmp_path):
+    """Test that a failing LLM call stops the pipeline and is raised."""
+    def failing(chunk):
+        raise RuntimeError("DeepSeek API error: 500")
+    original = tmp_path / "original.pdf"
+    original.write_bytes(b"previous output")
+    with pytest.raises(RuntimeError, match="500"):
+        run_pipeline("unused.pdf", failing, str(original), str(tmp_path / "answer.pdf"),
+                     pages=_pages(generate_bank(40, seed=5)))
+    # no truncated exam is saved over the previous outputs
+    assert original.read_bytes() == b"previous output"
+    assert not (tmp_path / "answer.pdf").exists()
+
+def test_pipeline_stops_workers_when_writing_fails(tmp_path):
+    """Test that an error in the writer stops every stage and keeps no output."""
+    def bad_markup(chunk):
+        return [{'question': "a < b <c", 'choices': [{'letter': 'A', 'text': "x"}]}]
+    before = threading.active_count()
+    with pytest.raises(ValueError):
+        run_pipeline("unused.pdf", bad_markup, str(tmp_path / "original.pdf"), None, workers=4,
+                     max_chunk_size=200, queue_size=1, pages=_pages(generate_bank(60, seed=6), size=100))
+    assert threading.active_count() == before
+    assert not (tmp_path / "original.pdf").exists()
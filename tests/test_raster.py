@@ -0,0 +1,38 @@
+"""Tests for raster-based highlight detection."""
+import pytest
+import fitz
+from pdf_tools.parser import PDFParser
+from pdf_tools.raster import RasterHighlightDetector, in_highlight_range
+
+LINES = ["1. Nhiễm khuẩn bệnh viện xảy ra sau nhập viện:", "A. 12 giờ", "B. 48 giờ", "C. 96 giờ"]
+
+def test_highlight_range():
+    """Test the colours treated as highlighter ink."""
+    assert in_highlight_range((1.0, 1.0, 0.0)) is True
+    assert in_highlight_range((0.98, 0.9, 0.3)) is True
+    assert in_highlight_range((1.0, 1.0, 1.0)) is False
+    assert in_highlight_range((0.0, 0.0, 0.0)) is False
+
+def test_mask_coverage(exam_pdf):
+    """Test that only the highlighted line is covered by the mask."""
+    path = exam_pdf([LINES], highlight=(0, 2))
+    doc = fitz.open(str(path))
+    mask = RasterHighlightDetector().page_mask(doc[0])
+    doc.close()
+    assert mask.any
+    assert mask.coverage((72, 97, 150, 111)) > 0.5   # "B. 48 giờ"
+    assert mask.coverage((72, 79, 150, 93)) == 0.0   # "A. 12 giờ"
+
+def test_parser_marks_baked_highlight_as_correct(exam_pdf):
+    """Test that PDFParser resolves the answer from a baked-in highlight."""
+    path = exam_pdf([LINES], highlight=(0, 2))
+    parser = PDFParser(str(path))
+    questions = parser.extract_questions()
+    parser.close()
+    assert len(questions) == 1
+    assert [c['letter'] for c in questions[0]['choices'] if c['is_correct']] == ['B']
+
+    parser = PDFParser(str(path), detect_raster_highlights=False)
+    questions = parser.extract_questions()
+    parser.close()
+    assert not any(c['is_correct'] for c in questions[0]['choices'])
@@ -0,0 +1,47 @@
+"""Tests for the single-pass exam tokenizer."""
+import pytest
+from pdf_tools.tokenizer import tokenize, parse_questions_and_answers, QUESTION, CHOICE, ANSWER
+
+def test_numbering_styles():
+    """Test that 'Câu n:', 'n.' and 'n)' all start a question."""
+    text = "Câu 1: Một?\nA. a\n2. Hai?\nA. b\n3) Ba?\nA) c\n"
+    questions, _ = parse_questions_and_answers(text)
+    assert [q['question'] for q in questions] == ["Một?", "Hai?", "Ba?"]
+    assert [q['choices'] for q in questions] == [[('A', 'a')], [('A', 'b')], [('A', 'c')]]
+
+def test_multiline_choices_and_no_choice_cap():
+    """Test wrapped choices are joined and more than seven choices are kept."""
+    letters = "ABCDEFG"
+    text = "Câu 1: Chọn\nvào đây\n" + "".join(f"{l}. lựa chọn {l}\n" for l in letters)
+    text += "dòng tiếp theo của G\n"
+    questions, _ = parse_questions_and_answers(text)
+    assert questions[0]['question'] == "Chọn vào đây"
+    assert len(questions[0]['choices']) == 7
+    assert questions[0]['choices'][-1] == ('G', "lựa chọn G dòng tiếp theo của G")
+
+def test_answer_key_table():
+    """Test answer keys on their own lines and several per line."""
+    text = "Câu 1: X\nA. a\nB. b\nĐÁP ÁN\n1-A 2-B, 3 - C\n4-D\n"
+    questions, answer_key = parse_questions_and_answers(text)
+    assert answer_key == {1: 'A', 2: 'B', 3: 'C', 4: 'D'}
+    # the table heading must not leak into the last choice
+    assert questions[0]['choices'][-1] == ('B', 'b')
+
+def test_wrapped_line_starting_with_dap_an():
+    """Test that a question line wrapped at "đáp án" is not taken for the key heading."""
+    text = "Câu 1: Trong các\nđáp án sau, đáp án nào đúng?\nA. x\nB. y\nBảng đáp án:\n1-B\n"
+    questions, answer_key = parse_questions_and_answers(text)
+    assert questions == [{'question': "Trong các đáp án sau, đáp án nào đúng?",
+                          'choices': [('A', 'x'), ('B', 'y')]}]
+    assert answer_key == {1: 'B'}
+
+def test_token_stream():
+    """Test the token kinds emitted for each line."""
+    kinds = [tok[0] for tok in tokenize("Câu 1: X\nA. a\n1-A\n")]
+    assert kinds == [QUESTION, CHOICE, ANSWER]
+
+def test_decimal_is_not_a_question():
+    """Test that a number followed by a decimal point is plain text."""
+    questions, _ = parse_questions_and_answers("Câu 1: Chiều cao\n1.5 mét\nA. a\n")
+    assert len(questions) == 1
+    assert questions[0]['question'] == "Chiều cao 1.5 mét"
@@ -0,0 +1,40 @@
+"""Tests for shuffled exam variants."""
+import fitz
+from pdf_tools.variants import ExamLayout, generate_variants
+
+QUESTIONS = [
+    {'question': "Thủ đô của Việt Nam?", 'choices': [
+        {'letter': 'A', 'text': 'Huế', 'is_correct': False},
+        {'letter': 'B', 'text': 'Hà Nội', 'is_correct': True},
+        {'letter': 'C', 'text': 'Đà Nẵng', 'is_correct': False},
+        {'letter': 'D', 'text': 'Tất cả đều sai', 'is_correct': False}]},
+    {'question': "Một cộng một?", 'choices': [
+        {'letter': 'A', 'text': 'Hai', 'is_correct': True},
+        {'letter': 'B', 'text': 'Ba', 'is_correct': False},
+        {'letter': 'C', 'text': 'Bốn', 'is_correct': False}]},
+    {'question': "Sông dài nhất?", 'answer': 'C', 'choices': [
+        ('A', 'Sông Hồng'), ('B', 'Sông Đà'), ('C', 'Sông Mê Kông')]},
+]
+
+def test_variants_are_seeded():
+    """Test that the same seed gives the same permutations and answer keys."""
+    layout = ExamLayout(QUESTIONS)
+    assert layout.variant(3, seed=7) == ExamLayout(QUESTIONS).variant(3, seed=7)
+    keys = {tuple(layout.variant(i, seed=7).answers.items()) for i in range(20)}
+    assert len(keys) > 1
+    for i in range(20):
+        variant = layout.variant(i, seed=7)
+        first = variant.order.index(0)
+        assert variant.choice_orders[first][3] == 3  # "Tất cả đều sai" stays last
+
+def test_answer_key_matches_pdf(tmp_path):
+    """Test that each variant's answer letter points at the correct choice in its PDF."""
+    correct = {0: 'Hà Nội', 1: 'Hai', 2: 'Sông Mê Kông'}
+    for variant, path in generate_variants(QUESTIONS, 3, str(tmp_path), seed=1, title="Đề thi"):
+        doc = fitz.open(path)
+        lines = [line.strip() for line in doc[0].get_text().splitlines()]
+        doc.close()
+        assert lines[0] == f"Đề thi — Mã đề {variant.code}"
+        for number, q_idx in enumerate(variant.order, 1):
+            body = lines.index(f"Câu {number}: {QUESTIONS[q_idx]['question']}")
+            assert f"{variant.answers[number]}. {correct[q_idx]}" in lines[body + 1:body + 5]
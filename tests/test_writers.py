@@ -0,0 +1,74 @@
+"""Tests for the pluggable PDF writer backends."""
+import fitz
+import pytest
+from tests.helpers import build_questions
+from pdf_tools.writer import ExamWriter, IncrementalExamWriter, StoryWriter, get_writer
+
+def _words(path):
+    doc = fitz.open(str(path))
+    words = " ".join(page.get_text() for page in doc).split()
+    doc.close()
+    return words
+
+def _bold_letters(path):
+    """Text of the bold spans at the start of each choice line."""
+    letters = []
+    doc = fitz.open(str(path))
+    for page in doc:
+        for block in page.get_text("dict")['blocks']:
+            for line in block.get('lines', []):
+                span = line['spans'][0]
+                if 'Bold' in span['font'] and not span['text'].startswith("Câu"):
+                    letters.append(span['text'].strip())
+    doc.close()
+    return letters
+
+def test_story_matches_reportlab(tmp_path):
+    """Test that both backends print the same text and bold the same answers."""
+    questions = build_questions(40)
+    expected = [next(ch['letter'] for ch in q['choices'] if ch['is_correct']) for q in questions]
+    for name in ("reportlab", "story"):
+        writer = get_writer(name)
+        writer.write_original(questions, str(tmp_path / f"{name}_original.pdf"))
+        writer.write_exam(questions, str(tmp_path / f"{name}_answer.pdf"), show_answer=True)
+        assert _bold_letters(tmp_path / f"{name}_original.pdf") == []
+        assert _bold_letters(tmp_path / f"{name}_answer.pdf") == expected
+    assert _words(tmp_path / "story_original.pdf") == _words(tmp_path / "reportlab_original.pdf")
+    assert _words(tmp_path / "story_answer.pdf") == _words(tmp_path / "reportlab_answer.pdf")
+
+def test_story_escapes_and_subsets(tmp_path):
+    """Test that markup-like text is printed literally and the fonts are subset."""
+    questions = [{'question': "So sánh a < b & c > d?",
+                  'choices': [('A', "<b>đúng</b>"), ('B', "Sai")]}]
+    output = tmp_path / "exam.pdf"
+    StoryWriter().write_exam(questions, str(output), show_answer=True, answer_key={1: 'B'})
+    assert "a < b & c > d?" in " ".join(_words(output))
+    assert "<b>đúng</b>" in _words(output)
+    assert _bold_letters(output) == ["B"]
+    assert output.stat().st_size < 200 * 1024
+    with pytest.raises(ValueError):
+        get_writer("latex")
+
+def test_incremental_writer_matches_make_pdf_answers(tmp_path):
+    """Test that the pipeline writer judges tuple choices by answer_key, like make_pdf."""
+    questions = [{'question': "Hai cộng hai?", 'answer': 'A', 'choices': [('A', "3"), ('B', "4")]},
+                 {'question': "Ba cộng ba?", 'choices': [{'letter': 'A', 'text': "6", 'is_correct': True},
+                                                         {'letter': 'B', 'text': "7"}]}]
+    with IncrementalExamWriter(str(tmp_path / "original.pdf"), str(tmp_path / "answer.pdf"),
+                               answer_key={1: 'B'}) as writer:
+        for question in questions:
+            writer.add(question)
+    assert _bold_letters(tmp_path / "original.pdf") == []
+    assert _bold_letters(tmp_path / "answer.pdf") == ["B", "A"]
+
+def test_canvas_backend_uses_answer_key_for_tuple_choices(tmp_path):
+    """Test that every backend accepts (letter, text) choices with an explicit key."""
+    questions = [{'question': "Hai cộng hai?", 'choices': [('A', "3"), ('B', "4")]}]
+    for name in ("canvas", "reportlab", "story"):
+        output = tmp_path / f"{name}.pdf"
+        get_writer(name).write_exam(questions, str(output), show_answer=True, answer_key={1: 'B'})
+        # the canvas backend also sets the question in bold on the answer key
+        bold = _bold_letters(output)
+        assert "B" in bold and "A" not in bold
+    with pytest.raises(TypeError):
+        ExamWriter()